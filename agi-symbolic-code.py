@@ -6,8 +6,8 @@
 
 import re as ℜ
 from collections import Counter as Ξ
-import numpy as ℕ
-import torch as Θ
+ℕ = lambda: __import__("numpy")  # numpy, imported on first use only
+Θ = lambda: __import__("torch")  # torch, never needed by ↓/↑
 
 # Symbolic operators for common patterns
 Ω = lambda x,y: {**x,**y}  # merge
@@ -17,6 +17,14 @@ import torch as Θ
 Λ = lambda x,n: [x[i:i+n] for i in range(len(x)-n+1)]  # n-gram
 ℘ = lambda d,k: sorted(d.items(), key=k, reverse=True)  # sort
 
+# ONE alternation per dictionary, compiled once per version: ℳ[η] → (ν, (pattern, table))
+Ϻ = lambda δ,β: (Π((r'\b(?:{})\b' if β else '(?:{})').format(
+        '|'.join(ℜ.escape(k) for k in sorted(δ, key=len, reverse=True)))),
+    {k.lower():v for k,v in δ.items()})
+# substitute with memo entry ℳ[η]; δ is rebuilt only once ν has moved on
+Ϟ = lambda ℳ,η,ν,δ,τ,β=1: (lambda μ: μ[0].sub(lambda m: μ[1].get(m[0].lower(),m[0]), τ))(
+    ℳ[η][1] if ℳ.get(η,(None,))[0]==ν else (ℳ.update({η:(ν,Ϻ(δ(),β))}) or ℳ[η][1]))
+
 ◊Σ:  # StenographicProcessor
     def __init__(𝕊):
         𝕊.Φ = {  # phrases
@@ -39,24 +47,22 @@ import torch as Θ
         }
         𝕊.Λ = {}  # learned
         𝕊.ι = 1000  # counter
+        𝕊.ν = 0  # dictionary version; bump after editing Φ, Ψ or Ω
+        𝕊.ℳ = {}  # compiled patterns, per instance
 
     λ↓(𝕊,τ,α=1):  # compress
-        κ = τ
-        Δ = Ω(𝕊.Φ, 𝕊.Λ)
-        ∀φ ∈ ℘(Δ, lambda x:len(x[0])):
-            κ = Π(r'\b'+ℜ.escape(φ[0])+r'\b').sub(φ[1], κ)
+        κ = Ϟ(𝕊.ℳ,"Φ",𝕊.ν, lambda: Ω(𝕊.Φ,𝕊.Λ), τ)
         if α:
-            ∀ω ∈ 𝕊.Ω.items():
-                κ = Π(r'(\w+)'+ω[0]+r'\b').sub(r'\1'+ω[1], κ)
-        ∀ψ ∈ 𝕊.Ψ.items():
-            κ = Π(r'\b'+ψ[0]+r'\b').sub(ψ[1], κ)
+            ς = 𝕊.ℳ["Ω"][1] if 𝕊.ℳ.get("Ω",(None,))[0]==𝕊.ν else (𝕊.ℳ.update({"Ω":(𝕊.ν,
+                Π(r'(\w+)('+'|'.join(𝕊.Ω)+r')\b'))}) or 𝕊.ℳ["Ω"][1])
+            κ = ς.sub(lambda m: m[1]+𝕊.Ω.get(m[2].lower(),m[2]), κ)
+        κ = Ϟ(𝕊.ℳ,"Ψ",𝕊.ν, lambda: 𝕊.Ψ, κ)
         return κ, len(τ)/len(κ)
 
     λ↑(𝕊,κ):  # decompress
         τ = κ
-        ∀x ∈ [(𝕊.Ψ,1),(𝕊.Ω,0),(Ω(𝕊.Φ,𝕊.Λ),1)]:
-            ∀y ∈ x[0].items():
-                τ = Π(ℜ.escape(y[x[1]])).sub(y[1-x[1]], τ)
+        ∀(η,x,ι) ∈ [("Ψ↑",lambda: 𝕊.Ψ,1),("Ω↑",lambda: 𝕊.Ω,0),("Φ↑",lambda: Ω(𝕊.Φ,𝕊.Λ),1)]:
+            τ = Ϟ(𝕊.ℳ,η,𝕊.ν, lambda: {y[ι]:y[1-ι] for y in x().items()}, τ, 0)
         return τ
 
     λ∇(𝕊,Ⅽ,μ=100):  # learn
@@ -71,6 +77,7 @@ import torch as Θ
             if c≥μ:
                 𝕊.Λ[γ] = f"[ς{𝕊.ι}]"
                 𝕊.ι += 1
+                𝕊.ν += 1
 
 ◊Θ:  # Neural processor
     def __init__(𝕊,δ=768,λ=12):
@@ -114,7 +121,7 @@ import torch as Θ
         
         # Performance metrics in pure symbolic form
         Ω = {
-            "ρ̄": ℕ.mean([x["ρ"] for x in Φ]),
+            "ρ̄": ℕ().mean([x["ρ"] for x in Φ]),
             "Σ↓": sum(len(x["↓"]) for x in Φ),
             "Σ↑": sum(len(x["↑"]) for x in Φ),
             "Δ": lambda n: n²/((n/15)²),  # speedup function
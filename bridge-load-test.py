@@ -0,0 +1,422 @@
+#!/usr/bin/env python3
+"""
+LOAD TEST: Stenographic Bridge against a local mock LLM
+=======================================================
+Offline, reproducible throughput numbers for fleet sizing.
+
+A stdlib asyncio HTTP server imitates the OpenAI chat completions and
+Anthropic messages endpoints (plain and streaming), charging a fixed
+time-to-first-token plus a per-token delay. The driver replays a corpus
+at a target QPS through the sync, async and streaming bridges and reports
+throughput, p50/p99 latency and client CPU per request.
+
+    python bridge-load-test.py run --qps 50 --duration 10
+    python bridge-load-test.py serve --port 8765 --token-latency 0.01
+    python bridge-load-test.py run --url http://127.0.0.1:8765 --mode stream
+
+No dependencies beyond the standard library.
+"""
+
+import argparse
+import asyncio
+import importlib.util
+import json
+import multiprocessing
+import os
+import socket
+import statistics
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncIterator, Dict, List, Optional
+from urllib.parse import urlsplit
+
+# The bridge lives in a script with a hyphenated name
+_spec = importlib.util.spec_from_file_location(
+    "weekend_prototype", os.path.join(os.path.dirname(os.path.abspath(__file__)), "weekend-prototype.py"))
+weekend_prototype = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(weekend_prototype)
+StenographicBridge = weekend_prototype.StenographicBridge
+
+CORPUS = [
+    "In order to be able to understand artificial intelligence and machine learning, "
+    "we need to look at neural networks and natural language processing.",
+    "At this point in time, large language models are going to revolutionize how we "
+    "interact with artificial intelligence systems with respect to the user interface.",
+    "The fact that the return on investment would have been higher is going to matter "
+    "for the key performance indicator review, year over year.",
+    "Summarize the user experience research in accordance with the application "
+    "programming interface guidelines for the purpose of the quarter over quarter report.",
+]
+
+MODES = ("sync", "async", "stream")
+
+
+# --- Mock provider ---------------------------------------------------------
+
+class MockLLMServer:
+    """
+    Minimal HTTP/1.1 server answering POST /v1/chat/completions and
+    /v1/messages. The reply echoes the words of the last message (so
+    responses carry symbols for the bridge to expand), capped at
+    max_tokens, after first_token_latency + token_latency per word.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 8765,
+                 first_token_latency: float = 0.2, token_latency: float = 0.01,
+                 max_tokens: int = 64):
+        self.host = host
+        self.port = port
+        self.first_token_latency = first_token_latency
+        self.token_latency = token_latency
+        self.max_tokens = max_tokens
+
+    async def serve_forever(self):
+        server = await asyncio.start_server(self._handle, self.host, self.port)
+        async with server:
+            await server.serve_forever()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            request_line = await reader.readline()
+            if not request_line.strip():
+                return  # readiness probe or idle connection
+            headers = {}
+            while True:
+                line = await reader.readline()
+                if line in (b"\r\n", b"\n", b""):
+                    break
+                name, _, value = line.decode("latin-1").partition(":")
+                headers[name.strip().lower()] = value.strip()
+            body = await reader.readexactly(int(headers.get("content-length", 0)))
+            method, path, _ = request_line.decode("latin-1").split(" ", 2)
+            if method != "POST" or path not in ("/v1/chat/completions", "/v1/messages"):
+                await self._send(writer, 404, {"error": f"no route {method} {path}"})
+                return
+
+            request = json.loads(body or b"{}")
+            content = request.get("messages", [{}])[-1].get("content", "")
+            limit = min(request.get("max_tokens") or self.max_tokens, self.max_tokens)
+            words = content.split()[:limit]
+            anthropic = path == "/v1/messages"
+            if request.get("stream"):
+                await self._stream(writer, words, anthropic)
+            else:
+                await asyncio.sleep(self.first_token_latency + self.token_latency * len(words))
+                await self._send(writer, 200, self._completion(" ".join(words), anthropic))
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    @staticmethod
+    def _completion(text: str, anthropic: bool) -> Dict[str, Any]:
+        if anthropic:
+            return {"type": "message", "role": "assistant",
+                    "content": [{"type": "text", "text": text}]}
+        return {"object": "chat.completion",
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": text}}]}
+
+    async def _send(self, writer: asyncio.StreamWriter, status: int, payload: Dict[str, Any]):
+        body = json.dumps(payload).encode("utf-8")
+        writer.write(f"HTTP/1.1 {status} {'OK' if status == 200 else 'Error'}\r\n"
+                     f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n"
+                     f"Connection: close\r\n\r\n".encode("latin-1") + body)
+        await writer.drain()
+
+    async def _stream(self, writer: asyncio.StreamWriter, words: List[str], anthropic: bool):
+        """Server-sent events, one word per event"""
+        writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\n"
+                     b"Cache-Control: no-cache\r\nConnection: close\r\n\r\n")
+        await asyncio.sleep(self.first_token_latency)
+        for index, word in enumerate(words):
+            piece = word if index == 0 else " " + word
+            if anthropic:
+                event = {"type": "content_block_delta", "index": 0,
+                         "delta": {"type": "text_delta", "text": piece}}
+            else:
+                event = {"object": "chat.completion.chunk",
+                         "choices": [{"index": 0, "delta": {"content": piece}}]}
+            writer.write(f"data: {json.dumps(event)}\n\n".encode("utf-8"))
+            await writer.drain()
+            await asyncio.sleep(self.token_latency)
+        writer.write(b'data: {"type": "message_stop"}\n\n' if anthropic else b"data: [DONE]\n\n")
+        await writer.drain()
+
+
+def run_server(host: str, port: int, first_token_latency: float, token_latency: float,
+               max_tokens: int):
+    server = MockLLMServer(host, port, first_token_latency, token_latency, max_tokens)
+    asyncio.run(server.serve_forever())
+
+
+# --- Clients ----------------------------------------------------------------
+
+def _request_body(prompt: str, stream: bool) -> bytes:
+    return json.dumps({"model": "mock", "stream": stream,
+                       "messages": [{"role": "user", "content": prompt}]}).encode("utf-8")
+
+
+def sync_llm(url: str):
+    """Blocking OpenAI-style client, as used by process_with_llm"""
+    endpoint = url.rstrip("/") + "/v1/chat/completions"
+
+    def call(prompt: str) -> str:
+        request = urllib.request.Request(endpoint, data=_request_body(prompt, False),
+                                         headers={"Content-Type": "application/json"})
+        with urllib.request.urlopen(request, timeout=60) as response:
+            return json.load(response)["choices"][0]["message"]["content"]
+
+    return call
+
+
+async def _open(url: str, prompt: str, stream: bool):
+    """Send one POST over a fresh connection; returns the reader after the headers."""
+    parts = urlsplit(url)
+    reader, writer = await asyncio.open_connection(parts.hostname, parts.port or 80)
+    body = _request_body(prompt, stream)
+    writer.write(f"POST /v1/chat/completions HTTP/1.1\r\nHost: {parts.netloc}\r\n"
+                 f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n"
+                 f"Connection: close\r\n\r\n".encode("latin-1") + body)
+    await writer.drain()
+    status = await reader.readline()
+    if b" 200 " not in status:
+        writer.close()
+        raise RuntimeError(f"mock LLM returned {status.decode('latin-1').strip()}")
+    while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+        pass
+    return reader, writer
+
+
+def async_llm(url: str):
+    """asyncio client for process_with_llm_async"""
+    async def call(prompt: str) -> str:
+        reader, writer = await _open(url, prompt, stream=False)
+        try:
+            return json.loads(await reader.read())["choices"][0]["message"]["content"]
+        finally:
+            writer.close()
+
+    return call
+
+
+def stream_llm(url: str):
+    """asyncio SSE client for stream_with_llm"""
+    async def call(prompt: str) -> AsyncIterator[str]:
+        reader, writer = await _open(url, prompt, stream=True)
+        try:
+            async for line in reader:
+                if not line.startswith(b"data: "):
+                    continue
+                data = line[6:].strip()
+                if data == b"[DONE]":
+                    break
+                content = json.loads(data)["choices"][0]["delta"].get("content")
+                if content:
+                    yield content
+        finally:
+            writer.close()
+
+    return call
+
+
+# --- Driver -----------------------------------------------------------------
+
+def _percentile(values: List[float], fraction: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def _report(mode: str, latencies: List[float], first_tokens: List[float], errors: int,
+            wall: float, cpu: float) -> Dict[str, Any]:
+    done = len(latencies)
+    return {
+        "mode": mode,
+        "requests": done,
+        "errors": errors,
+        "throughput_rps": done / wall if wall else 0.0,
+        "p50_ms": _percentile(latencies, 0.50) * 1000,
+        "p99_ms": _percentile(latencies, 0.99) * 1000,
+        "mean_ms": statistics.fmean(latencies) * 1000 if latencies else 0.0,
+        "ttft_p50_ms": _percentile(first_tokens, 0.50) * 1000 if first_tokens else None,
+        "cpu_ms_per_request": cpu / done * 1000 if done else 0.0,
+    }
+
+
+def run_sync(url: str, corpus: List[str], qps: float, duration: float,
+             workers: int = 256) -> Dict[str, Any]:
+    """
+    Open-loop replay through process_with_llm on a thread pool. Latency is
+    measured from each request's scheduled start, so queueing behind a
+    saturated pool shows up instead of silently lowering the offered load.
+    """
+    bridge = StenographicBridge()
+    call = sync_llm(url)
+    latencies, lock = [], threading.Lock()
+    errors = 0
+
+    def one(prompt: str, scheduled: float):
+        nonlocal errors
+        try:
+            bridge.process_with_llm(prompt, call)
+        except Exception:
+            with lock:
+                errors += 1
+            return
+        with lock:
+            latencies.append(time.perf_counter() - scheduled)
+
+    total = int(qps * duration)
+    cpu_start, start = time.process_time(), time.perf_counter()
+    with ThreadPoolExecutor(workers) as pool:
+        for index in range(total):
+            scheduled = start + index / qps
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            pool.submit(one, corpus[index % len(corpus)], scheduled)
+    return _report("sync", latencies, [], errors, time.perf_counter() - start,
+                   time.process_time() - cpu_start)
+
+
+async def run_async(url: str, corpus: List[str], qps: float, duration: float,
+                    stream: bool = False) -> Dict[str, Any]:
+    """Open-loop replay through process_with_llm_async or stream_with_llm."""
+    bridge = StenographicBridge()
+    call = stream_llm(url) if stream else async_llm(url)
+    latencies, first_tokens = [], []
+    errors = 0
+
+    async def one(prompt: str, scheduled: float):
+        nonlocal errors
+        try:
+            if stream:
+                first = None
+                async for _ in bridge.stream_with_llm(prompt, call):
+                    if first is None:
+                        first = time.perf_counter() - scheduled
+                first_tokens.append(first if first is not None else time.perf_counter() - scheduled)
+            else:
+                await bridge.process_with_llm_async(prompt, call)
+        except Exception:
+            errors += 1
+            return
+        latencies.append(time.perf_counter() - scheduled)
+
+    total = int(qps * duration)
+    tasks = []
+    cpu_start, start = time.process_time(), time.perf_counter()
+    for index in range(total):
+        scheduled = start + index / qps
+        delay = scheduled - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        tasks.append(asyncio.create_task(one(corpus[index % len(corpus)], scheduled)))
+    await asyncio.gather(*tasks)
+    return _report("stream" if stream else "async", latencies, first_tokens, errors,
+                   time.perf_counter() - start, time.process_time() - cpu_start)
+
+
+def load_corpus(path: Optional[str]) -> List[str]:
+    """One prompt per line, or JSON lines with a "prompt" field."""
+    if path is None:
+        return CORPUS
+    prompts = []
+    with open(path, 'r', encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            prompts.append(json.loads(line)["prompt"] if line.startswith("{") else line)
+    return prompts
+
+
+def _wait_for_port(host: str, port: int, timeout: float = 5.0):
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            socket.create_connection((host, port), timeout=0.2).close()
+            return
+        except OSError:
+            if time.monotonic() > deadline:
+                raise
+            time.sleep(0.05)
+
+
+def run_load_test(modes=MODES, qps: float = 20, duration: float = 5, url: Optional[str] = None,
+                  corpus: Optional[List[str]] = None, port: int = 8765,
+                  first_token_latency: float = 0.2, token_latency: float = 0.01,
+                  max_tokens: int = 64) -> List[Dict[str, Any]]:
+    """
+    Run each mode against url, or against a mock server started in a child
+    process (so its CPU is not charged to the client) when url is None.
+    """
+    corpus = corpus or CORPUS
+    server = None
+    if url is None:
+        server = multiprocessing.Process(
+            target=run_server, daemon=True,
+            args=("127.0.0.1", port, first_token_latency, token_latency, max_tokens))
+        server.start()
+        _wait_for_port("127.0.0.1", port)
+        url = f"http://127.0.0.1:{port}"
+    try:
+        results = []
+        for mode in modes:
+            if mode == "sync":
+                results.append(run_sync(url, corpus, qps, duration))
+            else:
+                results.append(asyncio.run(run_async(url, corpus, qps, duration,
+                                                     stream=mode == "stream")))
+        return results
+    finally:
+        if server is not None:
+            server.terminate()
+            server.join()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1],
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    serve = commands.add_parser("serve", help="run the mock LLM server")
+    run = commands.add_parser("run", help="replay a corpus through the bridges")
+    for command in (serve, run):
+        command.add_argument("--port", type=int, default=8765)
+        command.add_argument("--first-token-latency", type=float, default=0.2,
+                             help="seconds before the first token (default 0.2)")
+        command.add_argument("--token-latency", type=float, default=0.01,
+                             help="seconds per generated token (default 0.01)")
+        command.add_argument("--max-tokens", type=int, default=64)
+    run.add_argument("--url", help="existing server; default: start one locally")
+    run.add_argument("--mode", choices=MODES + ("all",), default="all")
+    run.add_argument("--qps", type=float, default=20)
+    run.add_argument("--duration", type=float, default=5, help="seconds of offered load")
+    run.add_argument("--corpus", help="prompts, one per line or JSONL with a 'prompt' field")
+    args = parser.parse_args()
+
+    if args.command == "serve":
+        print(f"Mock LLM on http://127.0.0.1:{args.port} "
+              f"(first token {args.first_token_latency}s, {args.token_latency}s/token)")
+        run_server("127.0.0.1", args.port, args.first_token_latency, args.token_latency,
+                   args.max_tokens)
+        return
+
+    modes = MODES if args.mode == "all" else (args.mode,)
+    results = run_load_test(modes, args.qps, args.duration, args.url, load_corpus(args.corpus),
+                            args.port, args.first_token_latency, args.token_latency,
+                            args.max_tokens)
+    print(f"{'mode':8} {'requests':>8} {'errors':>6} {'req/s':>8} {'p50 ms':>8} "
+          f"{'p99 ms':>8} {'TTFT ms':>8} {'CPU ms/req':>10}")
+    for r in results:
+        ttft = f"{r['ttft_p50_ms']:8.1f}" if r["ttft_p50_ms"] is not None else f"{'-':>8}"
+        print(f"{r['mode']:8} {r['requests']:8d} {r['errors']:6d} {r['throughput_rps']:8.1f} "
+              f"{r['p50_ms']:8.1f} {r['p99_ms']:8.1f} {ttft} {r['cpu_ms_per_request']:10.2f}")
+
+
+if __name__ == "__main__":
+    main()
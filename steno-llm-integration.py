@@ -1,8 +1,25 @@
-import numpy as np
+import importlib.util
+import os
 import time
 from typing import List, Tuple, Dict
-import torch
-import torch.nn as nn
+
+# torch is only needed by StenographicTransformer, which is defined on
+# first access (see __getattr__ at the bottom) so compression-only users
+# never pay for importing it
+
+_weekend_prototype = None
+
+def _load_weekend_prototype():
+    """weekend-prototype.py (a script with a hyphenated name), loaded on first use"""
+    global _weekend_prototype
+    if _weekend_prototype is None:
+        spec = importlib.util.spec_from_file_location(
+            "weekend_prototype",
+            os.path.join(os.path.dirname(os.path.abspath(__file__)), "weekend-prototype.py"))
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        _weekend_prototype = module
+    return _weekend_prototype
 
 class StenographicLLM:
     """
@@ -206,53 +223,84 @@ class RealWorldBenchmark:
 
 
 # Production-ready integration example
-class StenographicTransformer(nn.Module):
-    """
-    Drop-in replacement for standard transformer that includes
-    stenographic preprocessing and decompression.
-    """
+def _define_stenographic_transformer():
+    import torch
+    import torch.nn as nn
     
-    def __init__(self, base_transformer, processor):
-        super().__init__()
-        self.transformer = base_transformer
-        self.processor = processor
-        self.compression_cache = {}
-        
-    def forward(self, input_text: str) -> torch.Tensor:
+    class StenographicTransformer(nn.Module):
         """
-        Forward pass with automatic compression.
+        Drop-in replacement for standard transformer that includes
+        stenographic preprocessing and decompression.
         """
-        # Check cache
-        text_hash = hash(input_text)
-        if text_hash in self.compression_cache:
-            compressed = self.compression_cache[text_hash]
-        else:
-            compressed, _ = self.processor.compress(input_text, aggressive=True)
-            self.compression_cache[text_hash] = compressed
-        
-        # Process compressed sequence (would tokenize in real implementation)
-        # output = self.transformer(compressed)
-        
-        # For demo, return mock output
-        return torch.randn(1, len(compressed.split()), 768)
+
+        def __init__(self, base_transformer, processor):
+            super().__init__()
+            self.transformer = base_transformer
+            self.processor = processor
+            self.compression_cache = None
+            self._cache_sources = (None, None)
+
+        def _cache(self):
+            """
+            Near-duplicate compression cache, rebuilt whenever the
+            processor's dictionary or suffix table changes.
+            """
+            processor = self.processor
+            dictionary = processor.dictionary
+            cached_dictionary, cached_suffixes = self._cache_sources
+            if cached_dictionary is not dictionary or cached_suffixes is not processor.suffix_table:
+                self.compression_cache = _load_weekend_prototype().NearDuplicateCache(
+                    lambda text: processor.compress(text, aggressive=True)[0],
+                    phrases=[phrase for phrase, _ in dictionary] + list(processor.phonetic_dict),
+                    ignore_case=True,
+                    # Code, JSON and URLs are copied through, so a line
+                    # compresses differently inside them
+                    keep_whole=lambda text: bool(processor.protected_spans(text)),
+                )
+                self._cache_sources = (dictionary, processor.suffix_table)
+            return self.compression_cache
+
+        def forward(self, input_text: str) -> torch.Tensor:
+            """
+            Forward pass with automatic compression.
+            """
+            # Prompts that differ from a recent one only in a name or a date
+            # reuse its compressed segments
+            compressed = self._cache().get(input_text)
+
+            # Process compressed sequence (would tokenize in real implementation)
+            # output = self.transformer(compressed)
+
+            # For demo, return mock output
+            return torch.randn(1, len(compressed.split()), 768)
+
+        def generate(self, prompt: str, max_length: int = 100) -> str:
+            """
+            Generate text with compression/decompression.
+            """
+            # Compress prompt
+            compressed_prompt, _ = self.processor.compress(prompt, aggressive=True)
+
+            # Generate on compressed representation
+            # compressed_output = self.transformer.generate(compressed_prompt, max_length//15)
+
+            # For demo, create mock compressed output
+            compressed_output = compressed_prompt + " [ML] [IGT] revolutionize [WRT] [AI]"
+
+            # Decompress back to human readable
+            output = self.processor.decompress(compressed_output)
+
+            return output
     
-    def generate(self, prompt: str, max_length: int = 100) -> str:
-        """
-        Generate text with compression/decompression.
-        """
-        # Compress prompt
-        compressed_prompt, _ = self.processor.compress(prompt, aggressive=True)
-        
-        # Generate on compressed representation
-        # compressed_output = self.transformer.generate(compressed_prompt, max_length//15)
-        
-        # For demo, create mock compressed output
-        compressed_output = compressed_prompt + " [ML] [IGT] revolutionize [WRT] [AI]"
-        
-        # Decompress back to human readable
-        output = self.processor.decompress(compressed_output)
-        
-        return output
+    return StenographicTransformer
+
+
+def __getattr__(name):
+    """PEP 562 hook: build torch-backed classes on first use."""
+    if name == "StenographicTransformer":
+        transformer = globals()[name] = _define_stenographic_transformer()
+        return transformer
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 if __name__ == "__main__":
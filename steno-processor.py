@@ -1,8 +1,891 @@
+import os
 import re
-from collections import Counter
-from typing import Dict, List, Tuple
+import sys
+import threading
+import time
+import tracemalloc
+import zlib
+from array import array
+from collections import Counter, deque
+from concurrent.futures import Executor, ProcessPoolExecutor
+from dataclasses import dataclass
+from itertools import count, islice
+from typing import Dict, Iterable, Iterator, List, Mapping, Optional, Sequence, Tuple
 import hashlib
 
+# Every phrase symbol is a bracketed token such as [IOT] or [C1000]
+SYMBOL_PATTERN = re.compile(r'\[[^\[\]\s]+\]')
+# Symbols analyze_corpus numbers from symbol_counter
+LEARNED_SYMBOL = re.compile(r'\[C(\d+)\]')
+
+WORD_PATTERN = re.compile(r'\w+')
+
+# Alternating word / non-word runs; phrases match on whole runs, which
+# gives the same boundaries as the r'\b...\b' patterns
+TOKEN_PATTERN = re.compile(r'\w+|\W+')
+
+# Byte-level counterparts for compress_bytes/decompress_bytes. On ASCII
+# input bytes patterns match exactly like the str ones; anything else
+# takes the str path
+NON_ASCII = re.compile(rb'[^\x00-\x7f]')
+SYMBOL_BYTES = re.compile(rb'\[[^\[\]\s]+\]')
+WORD_BYTES = re.compile(rb'\w+')
+
+# Spans compress/decompress copy through untouched: fenced code (to the
+# closing fence, or the end of an unterminated block), inline code, URLs,
+# email addresses and JSON objects/arrays (see protected_spans). A span
+# can only start at, or for emails and URL schemes contain, one of these
+# triggers or "www.". A single character class keeps the scan fast on
+# plain prose (top-level alternation is several times slower), and the
+# lookbehinds drop "[", "{" and ":" that cannot open JSON or a URL
+PROTECTED_TRIGGER = re.compile(r'[`~{\[@:](?<!\[(?!\s*[{"]))(?<!\{(?!\s*["}]))(?<!:(?!//))')
+PROTECTED_TRIGGER_BYTES = re.compile(PROTECTED_TRIGGER.pattern.encode("ascii"))
+WWW_BYTES = re.compile(rb'www\.')
+FENCED_CODE = re.compile(r'(`{3,}|~{3,})[\s\S]*?(?:\1|\Z)')
+INLINE_CODE = re.compile(r'`[^`\n]+`')
+URL_SCHEME = re.compile(r'[A-Za-z][A-Za-z0-9+.-]*$')
+URL_REST = re.compile(r'[^\s<>"\'`]*[^\s<>"\'`.,;:!?)\]]')
+EMAIL_LOCAL = re.compile(r'\w[\w.+-]*$')
+EMAIL_DOMAIN = re.compile(r'[\w-]+(?:\.[\w-]+)+')
+
+# Strings and brackets, all protected_spans needs to find where JSON ends
+JSON_TOKEN = re.compile(r'"(?:[^"\\]|\\.)*"|[\[\]{}]')
+
+
+@dataclass(frozen=True)
+class CompressionLevel:
+    """One operating point on the speed/ratio curve"""
+    name: str
+    phonetic: bool = False
+    suffixes: bool = False
+    domain: bool = False
+    optimal: bool = False
+
+
+# Numbered like zstd: higher is slower with a better ratio. Measured with
+# benchmark_levels() on the demo corpus below (CPython 3.11, one core):
+#
+#   level  stages                         throughput   ratio
+#   1      phrase matcher                 ~9.5 MB/s    1.55x
+#   2      + phonetic (default)           ~7.5 MB/s    1.57x
+#   3      + suffixes (aggressive=True)   ~7.5 MB/s    1.57x
+#   4      + domain dictionary            ~7.0 MB/s    1.57x
+#   5      optimal-parse cover            ~3.5 MB/s    1.57x
+#
+# (The suffix table is empty under the default cost model, so levels 3-5
+# only differ on corpora with domain words or a tokenizer-backed model.)
+COMPRESSION_LEVELS = {
+    1: CompressionLevel("phrases"),
+    2: CompressionLevel("phonetic", phonetic=True),
+    3: CompressionLevel("suffix", phonetic=True, suffixes=True),
+    4: CompressionLevel("domain", phonetic=True, suffixes=True, domain=True),
+    5: CompressionLevel("optimal", phonetic=True, suffixes=True, domain=True, optimal=True),
+}
+DEFAULT_LEVEL = 2
+AGGRESSIVE_LEVEL = 3
+
+# backend="auto" uses the regex matcher up to this many entries and the
+# automaton above it. re tries alternatives one by one, so its scan slows
+# with dictionary size while the automaton stays flat; benchmark_backends()
+# on the demo corpus puts the crossover around 50-60 entries:
+#
+#   entries   regex        automaton
+#   ~40       ~7.2 MB/s    ~6.3 MB/s
+#   ~140      ~1.6 MB/s    ~3.3 MB/s
+#   ~1000     ~0.17 MB/s   ~2.6 MB/s
+#   ~30000    ~0.01 MB/s   ~4.2 MB/s
+REGEX_BACKEND_MAX_ENTRIES = 64
+
+# compress_chunked / decompress_chunked split long inputs into chunks of
+# about this many characters, at whitespace followed by a word
+DEFAULT_CHUNK_CHARS = 1 << 16
+CHUNK_SPLIT = re.compile(r'\s+(?=\w)')
+
+
+class TokenCostModel:
+    """
+    Estimated tokenizer cost of a string, used to score replacements.
+    
+    The default is the same ~4 characters per token estimate used by
+    benchmark_compression; pass encode= (e.g. a tiktoken encoder's encode)
+    to score with a real tokenizer instead.
+    """
+    
+    def __init__(self, chars_per_token: float = 4.0, encode=None):
+        self.chars_per_token = chars_per_token
+        self.encode = encode
+        self._cache: Dict[str, float] = {}
+    
+    def cost(self, text: str) -> float:
+        if self.encode is None:
+            return len(text) / self.chars_per_token
+        cost = self._cache.get(text)
+        if cost is None:
+            if len(self._cache) > 65536:
+                self._cache.clear()
+            cost = self._cache[text] = float(len(self.encode(text)))
+        return cost
+    
+    def savings(self, original: str, replacement: str) -> float:
+        return self.cost(original) - self.cost(replacement)
+
+
+class _NoSpan:
+    """Shared do-nothing span, so disabled profiling costs one branch per stage"""
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc):
+        return False
+
+
+_NO_SPAN = _NoSpan()
+
+
+class _Span:
+    __slots__ = ("profiler", "name", "root", "start", "memory", "blocks", "traced")
+    
+    def __init__(self, profiler: "Profiler", name: str, root: bool = False):
+        self.profiler = profiler
+        self.name = name
+        self.root = root
+    
+    def __enter__(self):
+        profiler = self.profiler
+        if self.root:
+            profiler._local.stack = []
+            self.traced = profiler.trace_allocations and not tracemalloc.is_tracing()
+            if self.traced:
+                tracemalloc.start()
+        stack = profiler._local.stack
+        if profiler.trace_allocations:
+            # The parent keeps the high-water mark reached so far, so this
+            # span can restart tracemalloc's peak for its own
+            size, peak = tracemalloc.get_traced_memory()
+            if stack:
+                stack[-1][2] = max(stack[-1][2], peak)
+            tracemalloc.reset_peak()
+            self.memory = size
+        stack.append([self.name, 0, 0])  # name, time spent in children, peak memory
+        self.start = time.perf_counter_ns()
+        # Counted last, so the span's own bookkeeping is left out
+        self.blocks = sys.getallocatedblocks() if profiler.trace_allocations else 0
+        return self
+    
+    def __exit__(self, *exc):
+        blocks = sys.getallocatedblocks() - self.blocks if self.blocks else 0
+        elapsed = time.perf_counter_ns() - self.start
+        profiler = self.profiler
+        stack = profiler._local.stack
+        peak = 0
+        if profiler.trace_allocations:
+            high = max(stack[-1][2], tracemalloc.get_traced_memory()[1])
+            if len(stack) > 1:
+                stack[-2][2] = max(stack[-2][2], high)
+            peak = high - self.memory
+        path = tuple(frame[0] for frame in stack)
+        _, children, _ = stack.pop()
+        if stack:
+            stack[-1][1] += elapsed
+        profiler._record(path, elapsed, elapsed - children, peak, blocks)
+        if self.root:
+            profiler._local.stack = None
+            if self.traced:
+                tracemalloc.stop()
+        return False
+
+
+class Profiler:
+    """
+    Opt-in stage timing for compress, decompress and analyze_corpus.
+    
+    One call in sample_every is profiled end to end: each stage records
+    its wall time and, with trace_allocations, its peak memory (the most
+    traced memory above what was allocated when the stage started;
+    tracemalloc runs only during sampled calls) and how many memory blocks
+    it left allocated (the change in sys.getallocatedblocks()). Unsampled calls, and
+    every call while StenographicProcessor.profiler is None, skip all of
+    it. Enable at runtime by assigning a Profiler, or at startup with
+    STENO_PROFILE=<sample_every> (plus STENO_PROFILE_ALLOC=1, and
+    STENO_PROFILE_OUT=<path> to write collapsed stacks at exit), which
+    sets ENV_PROFILER for every processor.
+    """
+    
+    def __init__(self, sample_every: int = 1, trace_allocations: bool = False):
+        self.sample_every = max(1, sample_every)
+        self.trace_allocations = trace_allocations
+        self.calls = 0
+        # stage path -> [calls, total_ns, self_ns, peak_bytes, net_blocks]
+        self.stages: Dict[Tuple[str, ...], List[int]] = {}
+        self._local = threading.local()
+        self._lock = threading.Lock()
+    
+    @classmethod
+    def from_env(cls) -> Optional["Profiler"]:
+        sample_every = os.environ.get("STENO_PROFILE")
+        if not sample_every:
+            return None
+        profiler = cls(int(sample_every), os.environ.get("STENO_PROFILE_ALLOC") == "1")
+        output = os.environ.get("STENO_PROFILE_OUT")
+        if output:
+            import atexit
+            import multiprocessing
+            # chunk_pool workers import this module too; only the parent writes
+            if multiprocessing.parent_process() is None:
+                atexit.register(profiler.dump, output)
+        return profiler
+    
+    def __reduce__(self):
+        # Span stacks and the lock stay behind; a copy (e.g. a chunk_pool
+        # worker's processor) starts empty
+        return type(self), (self.sample_every, self.trace_allocations)
+    
+    def call(self, name: str):
+        """Root span of a public entry point; sampling is decided here."""
+        if getattr(self._local, "stack", None):
+            return _Span(self, name)  # called from another profiled method
+        self.calls += 1
+        if self.calls % self.sample_every:
+            return _NO_SPAN
+        return _Span(self, name, root=True)
+    
+    def span(self, name: str):
+        """Stage span; records only inside a sampled call."""
+        if getattr(self._local, "stack", None):
+            return _Span(self, name)
+        return _NO_SPAN
+    
+    def _record(self, path: Tuple[str, ...], elapsed: int, own: int, peak: int, blocks: int):
+        with self._lock:
+            entry = self.stages.get(path)
+            if entry is None:
+                entry = self.stages[path] = [0, 0, 0, 0, 0]
+            entry[0] += 1
+            entry[1] += elapsed
+            entry[2] += own
+            entry[3] = max(entry[3], peak)
+            entry[4] += blocks
+    
+    def report(self) -> Dict[str, Dict]:
+        """
+        Per-stage calls, total/mean time, largest peak memory and mean net
+        allocated blocks, keyed "a/b".
+        """
+        with self._lock:
+            return {
+                "/".join(path): {
+                    "calls": calls,
+                    "total_ms": total / 1e6,
+                    "mean_us": total / calls / 1000,
+                    "self_ms": own / 1e6,
+                    "peak_bytes": peak,
+                    "mean_blocks": blocks / calls,
+                }
+                for path, (calls, total, own, peak, blocks) in sorted(self.stages.items())
+            }
+    
+    def collapsed(self) -> str:
+        """
+        Collapsed stacks ("compress;match 1234", self time in µs) for
+        flamegraph.pl, speedscope or inferno.
+        """
+        with self._lock:
+            return "".join(f"{';'.join(path)} {own // 1000}\n"
+                           for path, (_, _, own, _, _) in sorted(self.stages.items())
+                           if own >= 1000)
+    
+    def dump(self, path: str):
+        with open(path, 'w', encoding="utf-8") as f:
+            f.write(self.collapsed())
+    
+    def reset(self):
+        with self._lock:
+            self.stages.clear()
+            self.calls = 0
+
+
+# Shared by every processor, so STENO_PROFILE aggregates all of them and
+# STENO_PROFILE_OUT is written once at exit
+ENV_PROFILER = Profiler.from_env()
+
+
+def render_spans(text: str, offsets: Sequence[int], spans: Iterable[Tuple[int, int, str]]) -> str:
+    """Rebuild text with (first_token, end_token, replacement) spans applied."""
+    parts = []
+    position = 0
+    for start, end, replacement in spans:
+        parts.append(text[position:offsets[start]])
+        parts.append(replacement)
+        position = offsets[end]
+    if not parts:
+        return text
+    parts.append(text[position:])
+    return "".join(parts)
+
+
+def protected_spans(text: str) -> List[Tuple[int, int]]:
+    """
+    (start, end) of every span compress/decompress leave untouched, in
+    order, from one left-to-right scan over PROTECTED_TRIGGER. JSON runs
+    to its matching bracket (skipping over strings), or to the end of the
+    text if it is cut off; emails and URLs are extended back from their
+    "@" or "://" over the local part or scheme.
+    """
+    spans = []
+    position = 0
+    length = len(text)
+    search = PROTECTED_TRIGGER.search
+    trigger = search(text)
+    www = text.find("www.")
+    while True:
+        # Earliest trigger at or after position; each source is searched
+        # again only once position has passed its last hit
+        if trigger is not None and trigger.start() < position:
+            trigger = search(text, position)
+        if -1 < www < position:
+            www = text.find("www.", position)
+        at = trigger.start() if trigger is not None else length
+        if -1 < www < at:
+            at = www
+        if at == length:
+            return spans
+        kind = text[at]
+        found = None
+        if kind in "`~":
+            match = FENCED_CODE.match(text, at) or (kind == "`" and INLINE_CODE.match(text, at))
+            if match:
+                found = match.span()
+        elif kind in "{[":
+            depth = 0
+            found = (at, length)
+            for token in JSON_TOKEN.finditer(text, at):
+                bracket = token.group(0)
+                if bracket[0] == '"':
+                    continue
+                depth += 1 if bracket in "[{" else -1
+                if depth == 0:
+                    found = (at, token.end())
+                    break
+        elif kind == "@":
+            local = EMAIL_LOCAL.search(text, max(position, at - 64), at)
+            domain = EMAIL_DOMAIN.match(text, at + 1)
+            if local and domain:
+                found = (local.start(), domain.end())
+        elif kind == ":":
+            scheme = URL_SCHEME.search(text, max(position, at - 32), at)
+            rest = URL_REST.match(text, at + 3)
+            if scheme and rest:
+                found = (scheme.start(), rest.end())
+        elif not (at and (text[at - 1].isalnum() or text[at - 1] == "_")):
+            rest = URL_REST.match(text, at + 4)
+            if rest:
+                found = (at, rest.end())
+        if found is None:
+            position = at + 1
+            continue
+        spans.append(found)
+        position = found[1]
+
+
+def has_protected_bytes(data) -> bool:
+    """
+    Whether ASCII bytes hold a protected span. Records without a trigger
+    byte (or "www.") are answered without decoding them.
+    """
+    if PROTECTED_TRIGGER_BYTES.search(data) is None and WWW_BYTES.search(data) is None:
+        return False
+    return bool(protected_spans(str(data, "ascii")))
+
+
+def split_protected(text: str, protected: List[Tuple[int, int]]) -> Iterator[Tuple[int, int, bool]]:
+    """(start, end, is_protected) runs covering text, given protected_spans(text)."""
+    position = 0
+    for start, end in protected:
+        if start > position:
+            yield position, start, False
+        yield start, end, True
+        position = end
+    if position < len(text) or not protected:
+        yield position, len(text), False
+
+
+def protected_mask(text: str, protected: List[Tuple[int, int]]) -> bytearray:
+    """One byte per character of text, nonzero inside protected spans."""
+    mask = bytearray(len(text))
+    for start, end in protected:
+        mask[start:end] = b"\x01" * (end - start)
+    return mask
+
+
+def chunk_boundaries(text: str, chunk_size: int) -> List[int]:
+    """
+    Offsets [0, ..., len(text)] splitting text into chunks of at least
+    chunk_size characters. Every inner offset is the start of a word run
+    preceded by whitespace, so no chunk cuts a word or a symbol.
+    """
+    boundaries = [0]
+    position = chunk_size
+    while position < len(text):
+        split = CHUNK_SPLIT.search(text, position)
+        if split is None:
+            break
+        boundaries.append(split.end())
+        position = split.end() + chunk_size
+    boundaries.append(len(text))
+    return boundaries
+
+
+def optimal_cover(tokens: List[str], candidates: Iterable[Tuple[int, int, str]],
+                  cost_model: TokenCostModel) -> List[Tuple[int, int, str]]:
+    """
+    Choose the non-overlapping set of candidate replacements that minimizes
+    total output cost. Dynamic programming over token positions, linear in
+    tokens + candidates.
+    """
+    ending: Dict[int, List[Tuple[int, str]]] = {}
+    for start, end, replacement in candidates:
+        ending.setdefault(end, []).append((start, replacement))
+    
+    size = len(tokens)
+    best = [0.0] * (size + 1)
+    choice: List[Optional[Tuple[int, str]]] = [None] * (size + 1)
+    for index in range(1, size + 1):
+        best[index] = best[index - 1] + cost_model.cost(tokens[index - 1])
+        for start, replacement in ending.get(index, ()):
+            cost = best[start] + cost_model.cost(replacement)
+            # Strictly cheaper only: ties keep the original text
+            if cost < best[index]:
+                best[index] = cost
+                choice[index] = (start, replacement)
+    
+    cover = []
+    index = size
+    while index > 0:
+        if choice[index] is None:
+            index -= 1
+        else:
+            start, replacement = choice[index]
+            cover.append((start, index, replacement))
+            index = start
+    cover.reverse()
+    return cover
+
+
+# Stamps for _TrackedDict; process-wide, so no two dict states share one
+_STAMPS = count(1)
+
+
+class _TrackedDict(dict):
+    """
+    dict that takes a fresh stamp when created and on every modification,
+    so caches can key on its contents in O(1)
+    """
+    
+    __slots__ = ("stamp",)
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.stamp = next(_STAMPS)
+    
+    def _modifier(method):
+        def modify(self, *args, **kwargs):
+            self.stamp = next(_STAMPS)
+            return method(self, *args, **kwargs)
+        modify.__name__ = method.__name__
+        return modify
+    
+    __setitem__ = _modifier(dict.__setitem__)
+    __delitem__ = _modifier(dict.__delitem__)
+    __ior__ = _modifier(dict.__ior__)
+    update = _modifier(dict.update)
+    setdefault = _modifier(dict.setdefault)
+    pop = _modifier(dict.pop)
+    popitem = _modifier(dict.popitem)
+    clear = _modifier(dict.clear)
+    del _modifier
+    
+    def __reduce__(self):
+        return type(self), (dict(self),)
+
+
+class _DomainDict(_TrackedDict):
+    """domain -> words, where each words dict is tracked as well"""
+    
+    __slots__ = ()
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__()
+        self.update(*args, **kwargs)
+    
+    def __setitem__(self, domain: str, words: Mapping[str, str]):
+        super().__setitem__(domain, _TrackedDict(words))
+    
+    def update(self, *args, **kwargs):
+        for domain, words in dict(*args, **kwargs).items():
+            self[domain] = words
+    
+    def __ior__(self, other):
+        self.update(other)
+        return self
+    
+    def setdefault(self, domain: str, words: Optional[Mapping[str, str]] = None):
+        if domain not in self:
+            self[domain] = words or {}
+        return self[domain]
+    
+    def stamps(self) -> Tuple[int, ...]:
+        """Stamps of the mapping and of every domain's words"""
+        return (self.stamp,) + tuple(words.stamp for words in self.values())
+
+
+class CompactDictionary:
+    """
+    Immutable phrase -> symbol dictionary backed by contiguous buffers.
+    
+    Phrases and symbols live in two UTF-8 string pools with offset arrays,
+    and every entry is addressed by an integer symbol ID (its position in
+    phrase-sorted order). Lookups in both directions go through
+    open-addressing tables of IDs, so a 1M-entry dictionary costs a few
+    arrays instead of millions of Python objects.
+    """
+    
+    _EMPTY = -1
+    _MAGIC = b"STNODICT1"
+    
+    def __init__(self, entries: Iterable[Tuple[str, str]] = ()):
+        # Later entries win, matching {**phrase_dict, **learned_phrases}
+        merged = {}
+        for phrase, symbol in entries:
+            merged[phrase.lower()] = (phrase, symbol)
+        ordered = [merged[key] for key in sorted(merged)]
+        
+        self._phrase_pool, self._phrase_offsets = self._pack(p for p, _ in ordered)
+        self._symbol_pool, self._symbol_offsets = self._pack(s for _, s in ordered)
+        self._build_indexes()
+    
+    @classmethod
+    def from_dicts(cls, *dicts: Mapping[str, str]) -> "CompactDictionary":
+        """Build from one or more phrase -> symbol mappings (later wins)."""
+        return cls(item for d in dicts for item in d.items())
+    
+    @staticmethod
+    def _pack(strings: Iterable[str]) -> Tuple[bytes, array]:
+        encoded = [s.encode("utf-8") for s in strings]
+        offsets = array("I", [0])
+        position = 0
+        for data in encoded:
+            position += len(data)
+            offsets.append(position)
+        return b"".join(encoded), offsets
+    
+    def _build_indexes(self):
+        size = len(self)
+        self._lengths = array("I", (self._phrase_offsets[i + 1] - self._phrase_offsets[i]
+                                    for i in range(size)))
+        # Longest phrases first, so callers never have to sort per call
+        self._by_length = array("I", sorted(range(size), key=lambda i: -self._lengths[i]))
+        self._max_phrase_len = max((len(self.phrase(i)) for i in range(size)), default=0)
+        
+        capacity = 8
+        while capacity < size * 2:
+            capacity <<= 1
+        self._mask = capacity - 1
+        self._phrase_table = array("i", [self._EMPTY]) * capacity
+        self._symbol_table = array("i", [self._EMPTY]) * capacity
+        for i in range(size):
+            self._insert(self._phrase_table, self.phrase(i).lower().encode("utf-8"), i)
+            self._insert(self._symbol_table, self._symbol_bytes(i), i)
+    
+    def _insert(self, table: array, key: bytes, ident: int):
+        slot = zlib.crc32(key) & self._mask
+        while table[slot] != self._EMPTY:
+            slot = (slot + 1) & self._mask
+        table[slot] = ident
+    
+    def _probe(self, table: array, key: bytes, stored) -> int:
+        slot = zlib.crc32(key) & self._mask
+        while True:
+            ident = table[slot]
+            if ident == self._EMPTY or stored(ident) == key:
+                return ident
+            slot = (slot + 1) & self._mask
+    
+    def _phrase_bytes(self, ident: int) -> bytes:
+        return self._phrase_pool[self._phrase_offsets[ident]:self._phrase_offsets[ident + 1]]
+    
+    def _symbol_bytes(self, ident: int) -> bytes:
+        return self._symbol_pool[self._symbol_offsets[ident]:self._symbol_offsets[ident + 1]]
+    
+    def __len__(self) -> int:
+        return len(self._phrase_offsets) - 1
+    
+    def __iter__(self) -> Iterator[Tuple[str, str]]:
+        for i in range(len(self)):
+            yield self.phrase(i), self.symbol(i)
+    
+    def phrase(self, ident: int) -> str:
+        return self._phrase_bytes(ident).decode("utf-8")
+    
+    def symbol(self, ident: int) -> str:
+        return self._symbol_bytes(ident).decode("utf-8")
+    
+    def id_for_phrase(self, phrase: str) -> int:
+        """Case-insensitive phrase -> symbol ID, or -1."""
+        key = phrase.lower().encode("utf-8")
+        return self._probe(self._phrase_table, key,
+                           lambda i: self._phrase_bytes(i).decode("utf-8").lower().encode("utf-8"))
+    
+    def id_for_symbol(self, symbol: str) -> int:
+        """Symbol -> symbol ID, or -1."""
+        return self._probe(self._symbol_table, symbol.encode("utf-8"), self._symbol_bytes)
+    
+    def lookup_symbol(self, symbol: str) -> Optional[str]:
+        """O(1) symbol -> phrase lookup used by decompression."""
+        ident = self.id_for_symbol(symbol)
+        return None if ident == self._EMPTY else self.phrase(ident)
+    
+    def lookup_symbol_bytes(self, symbol: bytes) -> Optional[bytes]:
+        """lookup_symbol on UTF-8 bytes, straight from the string pools."""
+        ident = self._probe(self._symbol_table, symbol, self._symbol_bytes)
+        return None if ident == self._EMPTY else self._phrase_bytes(ident)
+    
+    def by_length(self) -> Iterator[Tuple[str, str]]:
+        """Iterate (phrase, symbol) pairs longest phrase first."""
+        for i in self._by_length:
+            yield self.phrase(i), self.symbol(i)
+    
+    @property
+    def max_phrase_len(self) -> int:
+        return self._max_phrase_len
+    
+    @property
+    def nbytes(self) -> int:
+        """Approximate resident size of the pools and index arrays."""
+        arrays = (self._phrase_offsets, self._symbol_offsets, self._lengths,
+                  self._by_length, self._phrase_table, self._symbol_table)
+        return (len(self._phrase_pool) + len(self._symbol_pool)
+                + sum(a.itemsize * len(a) for a in arrays))
+    
+    def to_bytes(self) -> bytes:
+        """Serialize pools and offsets; indexes are rebuilt on load."""
+        header = array("I", [len(self), len(self._phrase_pool), len(self._symbol_pool)])
+        return b"".join([self._MAGIC, header.tobytes(),
+                         self._phrase_offsets.tobytes(), self._symbol_offsets.tobytes(),
+                         self._phrase_pool, self._symbol_pool])
+    
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "CompactDictionary":
+        if not data.startswith(cls._MAGIC):
+            raise ValueError("not a compiled stenographic dictionary")
+        view = memoryview(data)[len(cls._MAGIC):]
+        header = array("I")
+        header.frombytes(view[:header.itemsize * 3])
+        size, phrase_bytes, symbol_bytes = header
+        view = view[header.itemsize * 3:]
+        
+        self = cls.__new__(cls)
+        self._phrase_offsets, view = cls._take_offsets(view, size + 1)
+        self._symbol_offsets, view = cls._take_offsets(view, size + 1)
+        self._phrase_pool = bytes(view[:phrase_bytes])
+        self._symbol_pool = bytes(view[phrase_bytes:phrase_bytes + symbol_bytes])
+        self._build_indexes()
+        return self
+    
+    @staticmethod
+    def _take_offsets(view: memoryview, count: int) -> Tuple[array, memoryview]:
+        offsets = array("I")
+        offsets.frombytes(view[:offsets.itemsize * count])
+        return offsets, view[offsets.itemsize * count:]
+    
+    def save(self, path: str):
+        with open(path, "wb") as f:
+            f.write(self.to_bytes())
+    
+    @classmethod
+    def load(cls, path: str) -> "CompactDictionary":
+        with open(path, "rb") as f:
+            return cls.from_bytes(f.read())
+
+class PhraseAutomaton:
+    """
+    Aho-Corasick automaton over word/non-word runs of a CompactDictionary.
+    
+    One pass over the text finds every dictionary phrase (case-insensitive,
+    on word boundaries) regardless of dictionary size, instead of running
+    one regex per phrase.
+    """
+    
+    def __init__(self, dictionary: CompactDictionary):
+        self.dictionary = dictionary
+        self.max_phrase_len = dictionary.max_phrase_len
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail = array("i", [0])
+        self._depth = array("I", [0])
+        self._output = array("i", [-1])
+        
+        for ident in range(len(dictionary)):
+            state = 0
+            for token in TOKEN_PATTERN.findall(dictionary.phrase(ident).lower()):
+                nxt = self._goto[state].get(token)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[state][token] = nxt
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._depth.append(self._depth[state] + 1)
+                    self._output.append(-1)
+                state = nxt
+            self._output[state] = ident
+        
+        # Breadth-first failure links plus a link to the nearest suffix
+        # state that ends a phrase, so overlapping matches are reported too
+        self._report = array("i", [-1]) * len(self._goto)
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for token, nxt in self._goto[state].items():
+                fallback = self._fail[state]
+                while fallback and token not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(token, 0)
+                self._fail[nxt] = target if target != nxt else 0
+                link = self._fail[nxt]
+                self._report[nxt] = link if self._output[link] >= 0 else self._report[link]
+                queue.append(nxt)
+    
+    @staticmethod
+    def tokenize(text: str) -> Tuple[List[str], List[int]]:
+        """Lowercased runs and their start offsets (plus the end offset)."""
+        lowered = text.lower()
+        if len(lowered) != len(text):
+            # A few characters lowercase to several; keep offsets aligned
+            lowered = "".join(c.lower()[0] for c in text)
+        tokens = TOKEN_PATTERN.findall(lowered)
+        offsets = [0]
+        position = 0
+        for token in tokens:
+            position += len(token)
+            offsets.append(position)
+        return tokens, offsets
+    
+    def find_all(self, tokens: List[str]) -> Iterator[Tuple[int, int, int]]:
+        """Yield (first_token, end_token, symbol_id) for every match."""
+        goto, fail, depth = self._goto, self._fail, self._depth
+        output, report = self._output, self._report
+        state = 0
+        for index, token in enumerate(tokens):
+            while state and token not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(token, 0)
+            hit = state if output[state] >= 0 else report[state]
+            while hit > 0:
+                yield index + 1 - depth[hit], index + 1, output[hit]
+                hit = report[hit]
+    
+    def leftmost_longest(self, tokens: List[str]) -> List[Tuple[int, int, int]]:
+        """Non-overlapping matches, preferring the earliest then the longest."""
+        chosen = []
+        covered = 0
+        for start, end, ident in sorted(self.find_all(tokens), key=lambda m: (m[0], -m[1])):
+            if start >= covered:
+                chosen.append((start, end, ident))
+                covered = end
+        return chosen
+    
+    def substitute(self, text: str) -> str:
+        """Replace leftmost-longest matches with their symbols."""
+        tokens, offsets = self.tokenize(text)
+        symbol = self.dictionary.symbol
+        return render_spans(text, offsets, ((start, end, symbol(ident))
+                                            for start, end, ident in self.leftmost_longest(tokens)))
+    
+    def spans(self, text: str) -> List[Tuple[int, int, str]]:
+        """Leftmost-longest matches as (start_char, end_char, symbol)."""
+        tokens, offsets = self.tokenize(text)
+        symbol = self.dictionary.symbol
+        return [(offsets[start], offsets[end], symbol(ident))
+                for start, end, ident in self.leftmost_longest(tokens)]
+    
+    def candidates(self, tokens: List[str]) -> Iterator[Tuple[int, int, str]]:
+        """Every (possibly overlapping) match as a replacement candidate."""
+        symbol = self.dictionary.symbol
+        for start, end, ident in self.find_all(tokens):
+            yield start, end, symbol(ident)
+
+
+class MegaPattern:
+    """
+    Regex fallback matcher: one alternation pattern per dictionary with a
+    dict-lookup replacement callback. Cheaper to build than an automaton
+    and faster on small dictionaries, since the scan runs inside re.
+    """
+    
+    def __init__(self, mapping: Mapping[str, str], boundaries: bool = True):
+        self.table = {}
+        for phrase, symbol in mapping.items():
+            self.table.setdefault(phrase.lower(), symbol)
+        self.max_phrase_len = max(map(len, self.table), default=0)
+        # Longest alternatives first, so each position takes its longest match
+        alternation = "|".join(re.escape(phrase) for phrase in
+                               sorted(self.table, key=len, reverse=True))
+        if boundaries:
+            alternation = r'\b(?:' + alternation + r')\b'
+        self.pattern = re.compile(alternation, re.IGNORECASE) if self.table else None
+    
+    @classmethod
+    def from_dictionary(cls, dictionary: CompactDictionary) -> "MegaPattern":
+        return cls(dict(dictionary))
+    
+    def _replace(self, match) -> str:
+        found = match.group(0)
+        return self.table.get(found.lower(), found)
+    
+    def substitute(self, text: str) -> str:
+        if self.pattern is None:
+            return text
+        return self.pattern.sub(self._replace, text)
+    
+    def spans(self, text: str) -> List[Tuple[int, int, str]]:
+        """Matches as (start_char, end_char, symbol), as substitute applies them."""
+        if self.pattern is None:
+            return []
+        return [(m.start(), m.end(), self._replace(m)) for m in self.pattern.finditer(text)]
+
+
+class BytesPattern(MegaPattern):
+    """
+    MegaPattern over UTF-8 bytes, substituting into a caller's bytearray.
+    Only used for ASCII input against ASCII keys, where bytes \b and
+    IGNORECASE behave exactly like their str counterparts.
+    """
+    
+    def __init__(self, mapping: Mapping[str, str], boundaries: bool = True):
+        self.table = {}
+        for phrase, symbol in mapping.items():
+            self.table.setdefault(phrase.lower().encode("utf-8"), symbol.encode("utf-8"))
+        self.max_phrase_len = max(map(len, self.table), default=0)
+        alternation = b"|".join(re.escape(phrase) for phrase in
+                                sorted(self.table, key=len, reverse=True))
+        if boundaries:
+            alternation = rb'\b(?:' + alternation + rb')\b'
+        self.pattern = re.compile(alternation, re.IGNORECASE) if self.table else None
+    
+    def substitute_into(self, data, out: bytearray) -> bytearray:
+        """Append data with matches replaced to out; unchanged runs are copied once."""
+        view = memoryview(data)
+        position = 0
+        if self.pattern is not None:
+            table = self.table
+            for match in self.pattern.finditer(view):
+                out += view[position:match.start()]
+                found = match.group(0)
+                out += table.get(found.lower(), found)
+                position = match.end()
+        out += view[position:]
+        return out
+
+
 class StenographicProcessor:
     """
     Advanced stenographic compression for LLM preprocessing.
@@ -79,132 +962,768 @@ class StenographicProcessor:
             "ly": "[+Y]",
         }
         
+        # Word -> (suffix length, suffix token) for words whose suffix form
+        # round-trips and saves tokens; see build_suffix_table
+        self.word_frequencies = Counter()
+        self.suffix_table: Dict[str, Tuple[int, str]] = {}
+        
+        # Domain-specific compressions (used by level 4 and
+        # create_context_aware_symbols)
+        self.domain_dict = {
+            "legal": {
+                "statement": "[ST]",  # legal statement
+                "evidence": "[EV]",
+                "defendant": "[DF]",
+                "plaintiff": "[PL]",
+            },
+            "tech": {
+                "function": "[FN]",
+                "variable": "[VR]",
+                "return": "[RT]",
+                "import": "[IM]",
+            },
+            "general": {}
+        }
+        
         # Learned compressions (will be populated by analyze_corpus)
         self.learned_phrases = {}
         self.symbol_counter = 1000  # Start custom symbols at [C1000]
         
+        # Compiled view of phrase_dict + learned_phrases, rebuilt only when
+        # the dictionaries change (see the `dictionary` property)
+        self.dictionary_version = 0
+        self._dictionary = None
+        self._dictionary_key = None
+        self._automata = {}
+        
+        # Scores replacements for the optimal-parse level
+        self.cost_model = TokenCostModel()
+        
+        # Stage timings for sampled calls; None disables them (see Profiler)
+        self.profiler = ENV_PROFILER
+    
+    def _call(self, name: str):
+        profiler = self.profiler
+        return _NO_SPAN if profiler is None else profiler.call(name)
+    
+    def _span(self, name: str):
+        profiler = self.profiler
+        return _NO_SPAN if profiler is None else profiler.span(name)
+    
+    # Assigned dicts are wrapped so in-place edits are seen by the
+    # compiled dictionary and matcher caches
+    @property
+    def phrase_dict(self) -> Dict[str, str]:
+        return self._phrase_dict
+    
+    @phrase_dict.setter
+    def phrase_dict(self, phrases: Mapping[str, str]):
+        self._phrase_dict = _TrackedDict(phrases)
+    
+    @property
+    def learned_phrases(self) -> Dict[str, str]:
+        return self._learned_phrases
+    
+    @learned_phrases.setter
+    def learned_phrases(self, phrases: Mapping[str, str]):
+        self._learned_phrases = _TrackedDict(phrases)
+    
+    @property
+    def phonetic_dict(self) -> Dict[str, str]:
+        return self._phonetic_dict
+    
+    @phonetic_dict.setter
+    def phonetic_dict(self, abbreviations: Mapping[str, str]):
+        self._phonetic_dict = _TrackedDict(abbreviations)
+    
+    @property
+    def suffix_dict(self) -> Dict[str, str]:
+        return self._suffix_dict
+    
+    @suffix_dict.setter
+    def suffix_dict(self, tokens: Mapping[str, str]):
+        self._suffix_dict = _TrackedDict(tokens)
+    
+    @property
+    def domain_dict(self) -> Dict[str, Dict[str, str]]:
+        return self._domain_dict
+    
+    @domain_dict.setter
+    def domain_dict(self, domains: Mapping[str, Mapping[str, str]]):
+        self._domain_dict = _DomainDict(domains)
+    
+    @property
+    def dictionary(self) -> CompactDictionary:
+        """
+        Immutable compiled phrase dictionary shared by compress/decompress.
+        Rebuilt lazily when dictionary_version changes, or phrase_dict or
+        learned_phrases is edited or replaced.
+        """
+        key = (self.dictionary_version, self._phrase_dict.stamp, self._learned_phrases.stamp)
+        if self._dictionary_key != key:
+            self._dictionary = CompactDictionary.from_dicts(self.phrase_dict, self.learned_phrases)
+            self._dictionary_key = key
+            self._automata.clear()
+        return self._dictionary
+    
+    def _matcher(self, level: CompressionLevel, domain: Optional[str] = None,
+                 backend: str = "automaton"):
+        """
+        Matcher for a level's dictionaries, built once per dictionary version.
+        backend is "automaton", "regex" or "auto" (regex for small dictionaries),
+        or "bytes" for compress_bytes, which gives None where auto would not
+        pick regex or a key is not ASCII.
+        """
+        dictionary = self.dictionary
+        key = (level.phonetic, domain)
+        # Entries hold the stamps they were built from and are replaced
+        # once the phonetic or domain words are edited
+        words = self.domain_dict.get(domain, {})
+        stamps = (self.phonetic_dict.stamp if level.phonetic else None,
+                  getattr(words, "stamp", None))
+        cached = self._automata.get(key + ("dictionary",))
+        if cached is None or cached[0] != stamps:
+            if not level.phonetic and domain is None:
+                merged = dictionary
+            else:
+                # Phrases win over phonetic/domain words on collisions
+                sources = [self.phonetic_dict] if level.phonetic else []
+                sources.append(words)
+                merged = CompactDictionary.from_dicts(*sources, self.phrase_dict,
+                                                      self.learned_phrases)
+            cached = self._automata[key + ("dictionary",)] = (stamps, merged)
+        merged = cached[1]
+        
+        if backend == "auto":
+            backend = "regex" if len(merged) <= REGEX_BACKEND_MAX_ENTRIES else "automaton"
+        if backend not in ("automaton", "regex", "bytes"):
+            raise ValueError(f"Unknown matcher backend {backend!r}")
+        cached = self._automata.get(key + (backend,))
+        if cached is not None and cached[0] == stamps:
+            return cached[1]
+        if backend == "bytes":
+            usable = (len(merged) <= REGEX_BACKEND_MAX_ENTRIES
+                      and all(phrase.isascii() for phrase, _ in merged))
+            matcher = BytesPattern.from_dictionary(merged) if usable else None
+        else:
+            factory = PhraseAutomaton if backend == "automaton" else MegaPattern.from_dictionary
+            matcher = factory(merged)
+        self._automata[key + (backend,)] = (stamps, matcher)
+        return matcher
+    
+    def _pattern(self, name: str, mapping: Mapping[str, str], stamp, boundaries: bool = True,
+                 kind=MegaPattern) -> "MegaPattern":
+        """
+        Memoized MegaPattern (or BytesPattern) for a small per-processor
+        dictionary, rebuilt when stamp (of the dicts mapping comes from) changes.
+        """
+        key = ("pattern", name, boundaries, kind)
+        cached = self._automata.get(key)
+        if cached is None or cached[0] != stamp:
+            cached = self._automata[key] = (stamp, kind(mapping, boundaries))
+        return cached[1]
+    
+    def _detect_domain(self, text: str) -> str:
+        lowered = text.lower()
+        if "legal" in lowered or "court" in lowered:
+            return "legal"
+        if "code" in lowered or "function" in lowered:
+            return "tech"
+        return "general"
+    
+    def load_dictionary(self, path: str):
+        """
+        Replace the learned phrases with a compiled dictionary artifact; the
+        built-in phrases stay, with the artifact winning on collisions.
+        """
+        self.learned_phrases = dict(CompactDictionary.load(path))
+        self.dictionary_version += 1
+        # New symbols from analyze_corpus must not reuse the loaded ones
+        for symbol in self.learned_phrases.values():
+            number = LEARNED_SYMBOL.fullmatch(symbol)
+            if number:
+                self.symbol_counter = max(self.symbol_counter, int(number.group(1)) + 1)
+        
     def analyze_corpus(self, texts: List[str], min_freq: int = 100) -> Dict[str, int]:
         """
         Analyze corpus to find common n-grams worth compressing.
         Returns frequency stats for validation.
         """
-        # Extract n-grams (2-6 words)
-        ngram_counts = Counter()
-        
-        for text in texts:
-            words = text.lower().split()
-            for n in range(2, 7):  # 2-6 word phrases
-                for i in range(len(words) - n + 1):
-                    ngram = " ".join(words[i:i+n])
-                    # Skip if already in dictionary
-                    if ngram not in self.phrase_dict:
-                        ngram_counts[ngram] += 1
-        
-        # Add high-frequency n-grams to learned dictionary
-        stats = {}
-        for ngram, count in ngram_counts.most_common(1000):
-            if count >= min_freq:
-                # Generate compact symbol
-                symbol = f"[C{self.symbol_counter}]"
-                self.learned_phrases[ngram] = symbol
-                self.symbol_counter += 1
-                stats[ngram] = count
+        with self._call("analyze_corpus"):
+            # Extract n-grams (2-6 words)
+            ngram_counts = Counter()
+            
+            for text in texts:
+                with self._span("word_frequencies"):
+                    self.word_frequencies.update(WORD_PATTERN.findall(text.lower()))
+                with self._span("ngrams"):
+                    words = text.lower().split()
+                    for n in range(2, 7):  # 2-6 word phrases
+                        for i in range(len(words) - n + 1):
+                            ngram = " ".join(words[i:i+n])
+                            # Skip if already in dictionary
+                            if ngram not in self.phrase_dict:
+                                ngram_counts[ngram] += 1
+            
+            # Add high-frequency n-grams to learned dictionary
+            with self._span("select"):
+                stats = {}
+                for ngram, count in ngram_counts.most_common(1000):
+                    if count >= min_freq:
+                        # Generate compact symbol
+                        symbol = f"[C{self.symbol_counter}]"
+                        self.learned_phrases[ngram] = symbol
+                        self.symbol_counter += 1
+                        stats[ngram] = count
+            
+            if stats:
+                self.dictionary_version += 1
+            with self._span("suffix_table"):
+                self.build_suffix_table(self.word_frequencies)
                 
         return stats
     
-    def compress(self, text: str, aggressive: bool = False) -> Tuple[str, float]:
+    def build_suffix_table(self, frequencies: Mapping[str, int], min_freq: int = 1,
+                           min_stem: int = 3) -> Dict[str, Tuple[int, str]]:
+        """
+        Precompute the word-level suffix stage from a word frequency list.
+        
+        A word gets an entry only if its stem is at least min_stem letters,
+        its suffix form decompresses back to the same word (so "visible" is
+        skipped, since [+B] restores "able"), and the form is cheaper under
+        cost_model. With the default ~4 chars/token estimate a suffix token
+        is never shorter than the suffix it replaces, so pass a real
+        tokenizer's cost model to get a non-trivial table.
+        """
+        # Longest suffixes first, and decompress restores the first suffix per token
+        suffixes = sorted(self.suffix_dict.items(), key=lambda item: len(item[0]), reverse=True)
+        restores = {}
+        for suffix, token in self.suffix_dict.items():
+            restores.setdefault(token, suffix)
+        
+        table = {}
+        for word, count in frequencies.items():
+            word = word.lower()
+            if count < min_freq or word in table:
+                continue
+            for suffix, token in suffixes:
+                if word.endswith(suffix) and len(word) - len(suffix) >= min_stem:
+                    form = word[:-len(suffix)] + token
+                    if (restores[token] == suffix and self.decompress(form) == word
+                            and self.cost_model.savings(word, form) > 0):
+                        table[word] = (len(suffix), token)
+                    break
+        self.suffix_table = table
+        return table
+    
+    def _compress_suffixes(self, text: str) -> str:
+        """Word-level suffix stage: one tokenizing pass plus table lookups."""
+        table = self.suffix_table
+        if not table:
+            return text
+        
+        def shorten(match):
+            word = match.group(0)
+            entry = table.get(word.lower())
+            if entry is None:
+                return word
+            return word[:-entry[0]] + entry[1]
+        
+        return WORD_PATTERN.sub(shorten, text)
+    
+    def compress(self, text: str, aggressive: bool = False,
+                 level: Optional[int] = None, backend: str = "auto") -> Tuple[str, float]:
         """
         Compress text using all available dictionaries.
         Returns (compressed_text, compression_ratio).
+        
+        level picks a COMPRESSION_LEVELS operating point (1 = fastest,
+        5 = best ratio); by default aggressive selects level 3, else level 2.
+        backend chooses the phrase matcher (see benchmark_backends).
+        Code, JSON, URLs and email addresses are copied through unchanged
+        (see protected_spans).
         """
+        if level is None:
+            level = AGGRESSIVE_LEVEL if aggressive else DEFAULT_LEVEL
+        if level not in COMPRESSION_LEVELS:
+            raise ValueError(f"Unknown compression level {level}; "
+                             f"expected one of {sorted(COMPRESSION_LEVELS)}")
+        stages = COMPRESSION_LEVELS[level]
         original_length = len(text)
-        compressed = text
-        
-        # Apply phrase-level compression (longest first to avoid subphrase issues)
-        all_phrases = {**self.phrase_dict, **self.learned_phrases}
-        sorted_phrases = sorted(all_phrases.keys(), key=len, reverse=True)
-        
-        for phrase in sorted_phrases:
-            token = all_phrases[phrase]
-            # Use word boundaries for safety
-            pattern = re.compile(r'\b' + re.escape(phrase) + r'\b', re.IGNORECASE)
-            compressed = pattern.sub(token, compressed)
-        
-        # Apply suffix compression if aggressive
-        if aggressive:
-            for suffix, token in self.suffix_dict.items():
-                # Match suffix at word end
-                pattern = re.compile(r'\b(\w+)' + suffix + r'\b', re.IGNORECASE)
-                compressed = pattern.sub(r'\1' + token, compressed)
-        
-        # Apply phonetic compression
-        for word, abbr in self.phonetic_dict.items():
-            pattern = re.compile(r'\b' + re.escape(word) + r'\b', re.IGNORECASE)
-            compressed = pattern.sub(abbr, compressed)
+        
+        with self._call("compress"):
+            with self._span("lex"):
+                protected = protected_spans(text)
+            domain = None
+            if stages.domain:
+                with self._span("detect_domain"):
+                    domain = self._detect_domain(text)
+            with self._span("matcher"):
+                matcher = self._matcher(stages, domain, "automaton" if stages.optimal else backend)
+            if stages.optimal:
+                # Needs every overlapping match, which only the automaton reports
+                return self._compress_optimal(text, matcher, protected)
+            
+            compressed = "".join(
+                text[start:end] if is_protected else self._compress_prose(text[start:end], stages, matcher)
+                for start, end, is_protected in split_protected(text, protected))
         
         compression_ratio = original_length / len(compressed) if compressed else 1.0
         return compressed, compression_ratio
     
+    def _compress_prose(self, text: str, stages: CompressionLevel, matcher) -> str:
+        # Phrase (and phonetic/domain word) compression in one pass
+        with self._span("phrases"):
+            compressed = matcher.substitute(text)
+        
+        # Apply suffix compression to the remaining words
+        if stages.suffixes:
+            with self._span("suffixes"):
+                compressed = self._compress_suffixes(compressed)
+        return compressed
+    
+    def compress_bytes(self, data, out: Optional[bytearray] = None, aggressive: bool = False,
+                       level: Optional[int] = None) -> bytearray:
+        """
+        compress() for UTF-8 bytes, bytearray or memoryview input, appending
+        the result to out (a new bytearray if None) and returning it.
+        
+        ASCII records are matched as bytes without decoding, and unchanged
+        runs are copied straight from the input into out. Non-ASCII
+        records, records holding code, JSON, URLs or emails, level 5
+        and dictionaries too large for the regex backend go through the str
+        path instead; either way the output is byte-identical to
+        compress(data.decode()).encode().
+        """
+        if out is None:
+            out = bytearray()
+        if level is None:
+            level = AGGRESSIVE_LEVEL if aggressive else DEFAULT_LEVEL
+        if level not in COMPRESSION_LEVELS:
+            raise ValueError(f"Unknown compression level {level}; "
+                             f"expected one of {sorted(COMPRESSION_LEVELS)}")
+        stages = COMPRESSION_LEVELS[level]
+        
+        matcher = None
+        if (not stages.optimal and NON_ASCII.search(data) is None
+                and not has_protected_bytes(data)):
+            domain = self._detect_domain(str(data, "ascii")) if stages.domain else None
+            matcher = self._matcher(stages, domain, "bytes")
+        if matcher is None:
+            out += self.compress(str(data, "utf-8"), level=level)[0].encode("utf-8")
+            return out
+        
+        if not (stages.suffixes and self.suffix_table):
+            return matcher.substitute_into(data, out)
+        return self._compress_suffixes_into(matcher.substitute_into(data, bytearray()), out)
+    
+    def _compress_suffixes_into(self, data, out: bytearray) -> bytearray:
+        """_compress_suffixes for ASCII bytes."""
+        cached = self._automata.get("bytes-suffix")
+        if cached is None or cached[0] is not self.suffix_table:
+            table = {word.encode("utf-8"): (length, token.encode("utf-8"))
+                     for word, (length, token) in self.suffix_table.items()}
+            cached = self._automata["bytes-suffix"] = (self.suffix_table, table)
+        table = cached[1]
+        
+        view = memoryview(data)
+        position = 0
+        for match in WORD_BYTES.finditer(view):
+            entry = table.get(match.group(0).lower())
+            if entry is not None:
+                stem_end = match.end() - entry[0]
+                out += view[position:stem_end]
+                out += entry[1]
+                position = match.end()
+        out += view[position:]
+        return out
+    
+    def _suffix_candidates(self, text: str, tokens: List[str],
+                           offsets: List[int]) -> Iterator[Tuple[int, int, str]]:
+        table = self.suffix_table
+        for index, token in enumerate(tokens):
+            entry = table.get(token)
+            if entry is not None:
+                stem = text[offsets[index]:offsets[index + 1] - entry[0]]
+                yield index, index + 1, stem + entry[1]
+    
+    @staticmethod
+    def _prose_candidates(candidates: List[Tuple[int, int, str]], offsets: List[int],
+                          mask: bytearray) -> List[Tuple[int, int, str]]:
+        """Candidates that do not touch a protected span (see protected_mask)."""
+        return [candidate for candidate in candidates
+                if mask.find(1, offsets[candidate[0]], offsets[candidate[1]]) == -1]
+    
+    def _compress_optimal(self, text: str, automaton: PhraseAutomaton,
+                          protected: List[Tuple[int, int]]) -> Tuple[str, float]:
+        """
+        Optimal-parse compression: phrase, phonetic, domain and suffix
+        replacements all compete in one cost-minimizing cover instead of
+        being applied greedily pass after pass.
+        """
+        with self._span("tokenize"):
+            tokens, offsets = automaton.tokenize(text)
+        with self._span("candidates"):
+            candidates = list(automaton.candidates(tokens))
+            candidates.extend(self._suffix_candidates(text, tokens, offsets))
+            if protected:
+                candidates = self._prose_candidates(candidates, offsets,
+                                                    protected_mask(text, protected))
+        with self._span("cover"):
+            cover = optimal_cover(tokens, candidates, self.cost_model)
+        with self._span("render"):
+            compressed = render_spans(text, offsets, cover)
+        compression_ratio = len(text) / len(compressed) if compressed else 1.0
+        return compressed, compression_ratio
+    
+    def compress_to_budget(self, text: str, max_tokens: float,
+                           max_level: int = max(COMPRESSION_LEVELS)) -> Tuple[str, float]:
+        """
+        Compress only as much as needed to fit max_tokens under cost_model.
+        Returns (compressed_text, compression_ratio) like compress.
+        
+        Text that already fits is returned untouched. Otherwise the current
+        level's candidate replacements are ranked by savings and applied
+        one at a time, largest first, until the running cost is under
+        budget; the next level's dictionaries are tried only if the current
+        level runs out of candidates. If even max_level cannot reach the
+        budget, its full compression is returned (check cost_model.cost).
+        """
+        if max_level not in COMPRESSION_LEVELS:
+            raise ValueError(f"Unknown compression level {max_level}; "
+                             f"expected one of {sorted(COMPRESSION_LEVELS)}")
+        cost_model = self.cost_model
+        total = cost_model.cost(text)
+        if total <= max_tokens:
+            return text, 1.0
+        
+        tokens, offsets = PhraseAutomaton.tokenize(text)
+        protected = protected_spans(text)
+        mask = protected_mask(text, protected) if protected else None
+        cover = []
+        searched = None
+        for level in range(1, max_level + 1):
+            stages = COMPRESSION_LEVELS[level]
+            domain = self._detect_domain(text) if stages.domain else None
+            candidates = list(self._matcher(stages, domain).candidates(tokens))
+            if stages.suffixes:
+                candidates.extend(self._suffix_candidates(text, tokens, offsets))
+            if mask is not None:
+                candidates = self._prose_candidates(candidates, offsets, mask)
+            if stages.optimal:
+                cover = optimal_cover(tokens, candidates, cost_model)
+                break
+            # Each level's candidates contain the previous level's, so the
+            # same count means nothing new to try
+            if len(candidates) == searched:
+                continue
+            searched = len(candidates)
+            
+            ranked = sorted(
+                ((cost_model.savings(text[offsets[start]:offsets[end]], replacement),
+                  start, end, replacement) for start, end, replacement in candidates),
+                key=lambda candidate: (-candidate[0], candidate[1]))
+            occupied = bytearray(len(tokens))
+            remaining = total
+            cover = []
+            for saving, start, end, replacement in ranked:
+                if saving <= 0 or remaining <= max_tokens:
+                    break
+                if any(occupied[start:end]):
+                    continue
+                occupied[start:end] = b"\x01" * (end - start)
+                cover.append((start, end, replacement))
+                remaining -= saving
+            if remaining <= max_tokens:
+                break
+        
+        cover.sort()
+        compressed = render_spans(text, offsets, cover)
+        compression_ratio = len(text) / len(compressed) if compressed else 1.0
+        return compressed, compression_ratio
+    
+    def chunk_pool(self, workers: Optional[int] = None) -> ProcessPoolExecutor:
+        """
+        Process pool for compress_chunked/decompress_chunked. Workers get a
+        copy of this processor as it is now; create a new pool after
+        changing the dictionaries.
+        """
+        return ProcessPoolExecutor(workers, initializer=_init_chunk_worker, initargs=(self,))
+    
+    def compress_chunked(self, text: str, aggressive: bool = False, level: Optional[int] = None,
+                         backend: str = "auto", chunk_size: int = DEFAULT_CHUNK_CHARS,
+                         pool: Optional[Executor] = None) -> Tuple[str, float]:
+        """
+        compress() for long documents, spread over a process pool.
+        
+        Each worker matches its chunk from the chunk start, scanning on
+        past the chunk end by the longest phrase length so matches across
+        the split are seen whole, and reports the matches starting in its
+        chunk. Where a match from the previous chunk runs over the split,
+        the parent re-matches from its end until it rejoins the worker's
+        matches, so the output is identical to compress(). Level 5 needs
+        one global cover and runs single-pass. pool is reused if given
+        (see chunk_pool), otherwise one is created for this call.
+        """
+        if level is None:
+            level = AGGRESSIVE_LEVEL if aggressive else DEFAULT_LEVEL
+        if level not in COMPRESSION_LEVELS:
+            raise ValueError(f"Unknown compression level {level}; "
+                             f"expected one of {sorted(COMPRESSION_LEVELS)}")
+        stages = COMPRESSION_LEVELS[level]
+        if stages.optimal or len(text) <= chunk_size:
+            return self.compress(text, level=level, backend=backend)
+        
+        # Domain detection looks at the whole text, as in compress()
+        domain = self._detect_domain(text) if stages.domain else None
+        # Built before the pool forks, so workers inherit it
+        matcher = self._matcher(stages, domain, backend)
+        overlap = matcher.max_phrase_len
+        # Each prose run between protected spans is matched on its own, as
+        # in compress(); windows of all runs go to the pool together
+        runs = [(text[start:end], is_protected) for start, end, is_protected
+                in split_protected(text, protected_spans(text))]
+        windows = []
+        for run, (prose, is_protected) in enumerate(runs):
+            if is_protected:
+                continue
+            boundaries = chunk_boundaries(prose, chunk_size)
+            for start, core_end in zip(boundaries, boundaries[1:]):
+                scan = CHUNK_SPLIT.search(prose, core_end + overlap)
+                windows.append((run, start, core_end, scan.end() if scan else len(prose)))
+        tasks = [(runs[run][0][start:window_end], start, core_end - start, level, domain, backend)
+                 for run, start, core_end, window_end in windows]
+        
+        owned = pool is None
+        if owned:
+            pool = self.chunk_pool()
+        try:
+            spans = {}
+            covered = 0
+            for (run, start, core_end, window_end), selections in zip(
+                    windows, pool.map(_chunk_spans, tasks)):
+                prose = runs[run][0]
+                if run not in spans:
+                    spans[run] = []
+                    covered = 0
+                if selections and selections[0][0] < covered:
+                    # A match from the previous chunk runs into this one
+                    selections = self._resync(matcher, prose, covered, core_end, window_end,
+                                              overlap, selections)
+                spans[run].extend(selections)
+                if spans[run]:
+                    covered = spans[run][-1][1]
+            runs = [(render_spans(prose, range(len(prose) + 1), spans[run]), is_protected)
+                    if not is_protected else (prose, is_protected)
+                    for run, (prose, is_protected) in enumerate(runs)]
+            
+            # The suffix stage is word-local, so any whitespace split is exact
+            if stages.suffixes and self.suffix_table:
+                pieces, chunks = self._prose_chunks(runs, chunk_size)
+                compressed = self._rejoin(pieces, pool.map(_chunk_suffixes, chunks))
+            else:
+                compressed = "".join(run for run, _ in runs)
+        finally:
+            if owned:
+                pool.shutdown()
+        
+        compression_ratio = len(text) / len(compressed) if compressed else 1.0
+        return compressed, compression_ratio
+    
+    @staticmethod
+    def _prose_chunks(runs: List[Tuple[str, bool]], chunk_size: int) -> Tuple[List, List[str]]:
+        """
+        Split the prose runs into whitespace-aligned chunks for the pool.
+        Returns (pieces, chunks): pieces holds each protected run as is and,
+        for each prose run, its number of chunks (see _rejoin).
+        """
+        pieces, chunks = [], []
+        for run, is_protected in runs:
+            if is_protected:
+                pieces.append(run)
+                continue
+            cuts = chunk_boundaries(run, chunk_size)
+            chunks.extend(run[a:b] for a, b in zip(cuts, cuts[1:]))
+            pieces.append(len(cuts) - 1)
+        return pieces, chunks
+    
+    @staticmethod
+    def _rejoin(pieces: List, results: Iterable[str]) -> str:
+        """Inverse of _prose_chunks, with each chunk replaced by its result."""
+        results = iter(results)
+        return "".join(piece if isinstance(piece, str) else "".join(islice(results, piece))
+                       for piece in pieces)
+    
+    @staticmethod
+    def _resync(matcher, text: str, position: int, core_end: int, window_end: int,
+                overlap: int, selections: List[Tuple[int, int, str]]) -> List[Tuple[int, int, str]]:
+        """
+        Matches of one chunk's core when matching really resumes at position
+        instead of at the chunk start. Re-matches short slices from position
+        until a match coincides with one of the worker's selections, after
+        which the two agree.
+        """
+        by_start = {start: i for i, (start, _, _) in enumerate(selections)}
+        accepted = []
+        span = 4 * overlap
+        while True:
+            scan = CHUNK_SPLIT.search(text, position + span, window_end)
+            limit = scan.end() if scan else window_end
+            # Matches starting later might be cut short by the slice end
+            safe = window_end if limit == window_end else limit - overlap - 1
+            base = position
+            for start, end, symbol in matcher.spans(text[base:limit]):
+                start, end = start + base, end + base
+                if start >= core_end:
+                    return accepted
+                if start > safe:
+                    break
+                index = by_start.get(start)
+                if index is not None and selections[index][1] == end:
+                    return accepted + selections[index:]
+                accepted.append((start, end, symbol))
+                position = end
+            else:
+                if limit == window_end:
+                    return accepted
+            span *= 2
+    
+    def protected_spans(self, text: str) -> List[Tuple[int, int]]:
+        """The spans of text compress and decompress copy through (see protected_spans)."""
+        return protected_spans(text)
+    
     def decompress(self, compressed: str) -> str:
         """
-        Reconstruct original text from compressed form.
+        Reconstruct original text from compressed form. Code, JSON, URLs
+        and email addresses were copied through by compress() and are
+        copied back unchanged.
         """
-        text = compressed
+        with self._call("decompress"):
+            with self._span("lex"):
+                protected = protected_spans(compressed)
+            tables = self._reverse_tables()
+            return "".join(
+                compressed[start:end] if is_protected
+                else self._decompress_prose(compressed[start:end], tables)
+                for start, end, is_protected in split_protected(compressed, protected))
+    
+    def _reverse_tables(self) -> Tuple[Dict[str, str], Dict[str, str], Dict[str, str]]:
+        """(abbreviation -> word, suffix token -> suffix, domain symbol -> word)"""
+        stamps = (self.phonetic_dict.stamp, self.suffix_dict.stamp) + self.domain_dict.stamps()
+        cached = self._automata.get("reverse-tables")
+        if cached is not None and cached[0] == stamps:
+            return cached[1]
+        # First word wins for shared abbreviations
+        abbreviations = {}
+        for word, abbr in self.phonetic_dict.items():
+            abbreviations.setdefault(abbr, word)
+        tokens = {}
+        for suffix, token in self.suffix_dict.items():
+            tokens.setdefault(token, suffix)
+        domain_words = {symbol: word for words in self.domain_dict.values()
+                        for word, symbol in words.items()}
+        tables = abbreviations, tokens, domain_words
+        self._automata["reverse-tables"] = (stamps, tables)
+        return tables
+    
+    def _decompress_prose(self, text: str, tables) -> str:
+        abbreviations, tokens, domain_words = tables
         
         # Reverse phonetic abbreviations
-        for word, abbr in self.phonetic_dict.items():
-            pattern = re.compile(r'\b' + re.escape(abbr) + r'\b', re.IGNORECASE)
-            text = pattern.sub(word, text)
+        with self._span("phonetic"):
+            text = self._pattern("phonetic-reverse", abbreviations,
+                                 self.phonetic_dict.stamp).substitute(text)
         
         # Reverse suffix tokens
-        for suffix, token in self.suffix_dict.items():
-            pattern = re.compile(re.escape(token), re.IGNORECASE)
-            text = pattern.sub(suffix, text)
-        
-        # Reverse phrase tokens (including learned)
-        all_phrases = {**self.phrase_dict, **self.learned_phrases}
-        for phrase, token in all_phrases.items():
-            pattern = re.compile(re.escape(token), re.IGNORECASE)
-            text = pattern.sub(phrase, text)
+        with self._span("suffixes"):
+            text = self._pattern("suffix-reverse", tokens, self.suffix_dict.stamp,
+                                 boundaries=False).substitute(text)
+        
+        # Reverse phrase tokens (including learned) with one O(1) lookup per symbol
+        with self._span("symbols"):
+            dictionary = self.dictionary
             
-        return text
+            def expand(match):
+                phrase = dictionary.lookup_symbol(match.group(0))
+                if phrase is None:
+                    return domain_words.get(match.group(0), match.group(0))
+                return phrase
+            
+            return SYMBOL_PATTERN.sub(expand, text)
+    
+    def decompress_bytes(self, data, out: Optional[bytearray] = None) -> bytearray:
+        """
+        decompress() for UTF-8 bytes, appending to out like compress_bytes.
+        ASCII input without code, JSON, URLs or emails is expanded without
+        decoding; the output is byte-identical to
+        decompress(data.decode()).encode().
+        """
+        if out is None:
+            out = bytearray()
+        abbreviations, tokens, _ = self._reverse_tables()
+        if (NON_ASCII.search(data) is not None
+                or has_protected_bytes(data)
+                or not all(k.isascii() for k in abbreviations)
+                or not all(k.isascii() for k in tokens)):
+            out += self.decompress(str(data, "utf-8")).encode("utf-8")
+            return out
+        
+        # Same three passes as decompress(); the first two need scratch buffers
+        text = self._pattern("phonetic-reverse", abbreviations, self.phonetic_dict.stamp,
+                             kind=BytesPattern).substitute_into(data, bytearray())
+        text = self._pattern("suffix-reverse", tokens, self.suffix_dict.stamp, boundaries=False,
+                             kind=BytesPattern).substitute_into(text, bytearray())
+        
+        dictionary = self.dictionary
+        domain_words = {symbol.encode("utf-8"): word.encode("utf-8")
+                        for words in self.domain_dict.values() for word, symbol in words.items()}
+        
+        view = memoryview(text)
+        position = 0
+        for match in SYMBOL_BYTES.finditer(view):
+            symbol = match.group(0)
+            phrase = dictionary.lookup_symbol_bytes(symbol)
+            if phrase is None:
+                phrase = domain_words.get(symbol, symbol)
+            out += view[position:match.start()]
+            out += phrase
+            position = match.end()
+        out += view[position:]
+        return out
+    
+    def decompress_chunked(self, compressed: str, chunk_size: int = DEFAULT_CHUNK_CHARS,
+                           pool: Optional[Executor] = None) -> str:
+        """
+        decompress() over a process pool. Abbreviations, suffix tokens and
+        symbols never contain whitespace, so chunks of prose split at
+        whitespace decompress independently to the same result; protected
+        spans are lexed once here and copied through.
+        """
+        if len(compressed) <= chunk_size:
+            return self.decompress(compressed)
+        pieces, chunks = self._prose_chunks(
+            [(compressed[start:end], is_protected) for start, end, is_protected
+             in split_protected(compressed, protected_spans(compressed))], chunk_size)
+        owned = pool is None
+        if owned:
+            pool = self.chunk_pool()
+        try:
+            return self._rejoin(pieces, pool.map(_chunk_decompress, chunks))
+        finally:
+            if owned:
+                pool.shutdown()
     
     def create_context_aware_symbols(self, text: str) -> str:
         """
         Create context-dependent compressions where same symbol 
         means different things based on surrounding tokens.
         """
-        # Domain detection
-        if "legal" in text.lower() or "court" in text.lower():
-            domain = "legal"
-        elif "code" in text.lower() or "function" in text.lower():
-            domain = "tech"
-        else:
-            domain = "general"
+        domain = self._detect_domain(text)
         
         # Apply domain-specific compressions
-        domain_specific = {
-            "legal": {
-                "statement": "[ST]",  # legal statement
-                "evidence": "[EV]",
-                "defendant": "[DF]",
-                "plaintiff": "[PL]",
-            },
-            "tech": {
-                "function": "[FN]",
-                "variable": "[VR]",
-                "return": "[RT]",
-                "import": "[IM]",
-            },
-            "general": {}
-        }
-        
-        compressed = text
-        for word, symbol in domain_specific.get(domain, {}).items():
-            pattern = re.compile(r'\b' + word + r'\b', re.IGNORECASE)
-            compressed = pattern.sub(symbol, compressed)
-            
-        return compressed
+        words = self.domain_dict.get(domain, {})
+        return self._pattern("domain-" + domain, words,
+                             getattr(words, "stamp", None)).substitute(text)
     
     def benchmark_compression(self, texts: List[str]) -> Dict:
         """
@@ -231,6 +1750,100 @@ class StenographicProcessor:
             "tokens_original": total_original // 4,  # Rough token estimate
             "tokens_compressed": total_compressed // 4,
         }
+    
+    def benchmark_backends(self, texts: List[str], sizes=(100, 1000, 10000, 50000),
+                           repeat: int = 5) -> List[Dict]:
+        """
+        Microbenchmark the regex and automaton matchers on synthetic learned
+        dictionaries of increasing size: build time and per-call throughput.
+        """
+        total_original = sum(len(text) for text in texts)
+        level = COMPRESSION_LEVELS[DEFAULT_LEVEL]
+        results = []
+        for size in sizes:
+            processor = StenographicProcessor()
+            processor.learned_phrases = {f"synthetic phrase {i}": f"[C{i}]" for i in range(size)}
+            row = {"entries": size}
+            for backend in ("regex", "automaton"):
+                start = time.perf_counter()
+                processor._matcher(level, backend=backend)
+                row[f"{backend}_build_s"] = time.perf_counter() - start
+                start = time.perf_counter()
+                for _ in range(repeat):
+                    for text in texts:
+                        processor.compress(text, level=DEFAULT_LEVEL, backend=backend)
+                elapsed = time.perf_counter() - start
+                row[f"{backend}_mb_s"] = total_original * repeat / elapsed / 1e6
+            results.append(row)
+        return results
+    
+    def benchmark_levels(self, texts: List[str], repeat: int = 20) -> Dict[int, Dict]:
+        """
+        Measure throughput and ratio of every compression level on a corpus.
+        These are the numbers documented next to COMPRESSION_LEVELS.
+        """
+        total_original = sum(len(text) for text in texts)
+        results = {}
+        for level, stages in COMPRESSION_LEVELS.items():
+            # Warm the per-level automaton outside the timed loop
+            total_compressed = sum(len(self.compress(text, level=level)[0]) for text in texts)
+            start = time.perf_counter()
+            for _ in range(repeat):
+                for text in texts:
+                    self.compress(text, level=level)
+            elapsed = time.perf_counter() - start
+            results[level] = {
+                "name": stages.name,
+                "throughput_mb_s": total_original * repeat / elapsed / 1e6,
+                "ratio": total_original / total_compressed,
+            }
+        return results
+    
+    def benchmark_chunked(self, text: str, workers=(1, 2, 4), repeat: int = 3,
+                          level: int = DEFAULT_LEVEL) -> List[Dict]:
+        """
+        Latency of compress_chunked on one long document per pool size,
+        against single-pass compress. Pool startup is not timed.
+        """
+        start = time.perf_counter()
+        for _ in range(repeat):
+            self.compress(text, level=level)
+        single = (time.perf_counter() - start) / repeat
+        results = []
+        for count in workers:
+            with self.chunk_pool(count) as pool:
+                self.compress_chunked(text, level=level, pool=pool)  # warm the workers
+                start = time.perf_counter()
+                for _ in range(repeat):
+                    self.compress_chunked(text, level=level, pool=pool)
+                elapsed = (time.perf_counter() - start) / repeat
+            results.append({"workers": count, "latency_s": elapsed, "speedup": single / elapsed})
+        return results
+
+
+# Chunk workers; each process holds one processor copy from chunk_pool
+_chunk_processor: Optional[StenographicProcessor] = None
+
+
+def _init_chunk_worker(processor: StenographicProcessor):
+    global _chunk_processor
+    _chunk_processor = processor
+
+
+def _chunk_spans(task) -> List[Tuple[int, int, str]]:
+    """(start, end, symbol) matches starting in the chunk's core, in text order."""
+    chunk, offset, core_length, level, domain, backend = task
+    matcher = _chunk_processor._matcher(COMPRESSION_LEVELS[level], domain, backend)
+    return [(offset + start, offset + end, symbol)
+            for start, end, symbol in matcher.spans(chunk) if start < core_length]
+
+
+def _chunk_suffixes(chunk: str) -> str:
+    return _chunk_processor._compress_suffixes(chunk)
+
+
+def _chunk_decompress(chunk: str) -> str:
+    return _chunk_processor._decompress_prose(chunk, _chunk_processor._reverse_tables())
 
 
 # Demonstration with real-world example
@@ -278,6 +1891,19 @@ if __name__ == "__main__":
     print("\nDecompressed:")
     print(decompressed)
     
+    # Budget mode: only as many replacements as needed to fit
+    budget = processor.cost_model.cost(test_text) * 0.9
+    fitted, ratio = processor.compress_to_budget(test_text, budget)
+    print(f"\nFitted to {budget:.0f} tokens ({ratio:.2f}x reduction):")
+    print(fitted)
+    
+    # Code, JSON, URLs and emails in a prompt are copied through unchanged
+    prompt = ("In order to reproduce it, see https://example.com/machine-learning and run "
+              "`train --with-respect-to data` with {\"artificial intelligence\": true}.")
+    compressed, ratio = processor.compress(prompt, aggressive=True)
+    print(f"\nMixed prompt ({ratio:.2f}x reduction):")
+    print(compressed)
+    
     # Benchmark on corpus
     print("\n" + "="*50)
     print("Compression Benchmark Results:")
@@ -288,3 +1914,29 @@ if __name__ == "__main__":
             print(f"{key}: {value:.2f}")
         else:
             print(f"{key}: {value}")
+    
+    print("\n" + "="*50)
+    print("Matcher Backends:")
+    print("="*50)
+    for row in processor.benchmark_backends(corpus, sizes=(0, 100, 1000)):
+        print(f"{row['entries']:6d} extra entries: regex {row['regex_mb_s']:.2f} MB/s, "
+              f"automaton {row['automaton_mb_s']:.2f} MB/s")
+    
+    print("\n" + "="*50)
+    print("Compression Levels:")
+    print("="*50)
+    for level, stats in processor.benchmark_levels(corpus).items():
+        print(f"level {level} ({stats['name']}): {stats['throughput_mb_s']:.1f} MB/s, "
+              f"{stats['ratio']:.2f}x")
+    
+    print("\n" + "="*50)
+    print("Stage Profile (set STENO_PROFILE=N to sample 1 call in N):")
+    print("="*50)
+    processor.profiler = Profiler(trace_allocations=True)
+    for level in COMPRESSION_LEVELS:
+        processor.decompress(processor.compress(" ".join(corpus), level=level)[0])
+    for stage, stats in processor.profiler.report().items():
+        print(f"{stage:24s} {stats['calls']:3d} calls, {stats['total_ms']:8.2f} ms, "
+              f"{stats['peak_bytes'] / 1024:8.1f} KiB peak, "
+              f"{stats['mean_blocks']:+8.0f} blocks")
+    processor.profiler = None
@@ -0,0 +1,33 @@
+"""
+Fixtures loading the top-level scripts, whose hyphenated names cannot be imported
+"""
+
+import importlib.util
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def load_script(filename: str, name: str):
+    """Import filename as module name (registered, so pickling and process pools find it)"""
+    module = sys.modules.get(name)
+    if module is None:
+        spec = importlib.util.spec_from_file_location(name, os.path.join(ROOT, filename))
+        module = importlib.util.module_from_spec(spec)
+        sys.modules[name] = module
+        spec.loader.exec_module(module)
+    return module
+
+@pytest.fixture(scope="session")
+def steno():
+    return load_script("steno-processor.py", "steno_processor")
+
+@pytest.fixture
+def processor(steno):
+    return steno.StenographicProcessor()
+
+@pytest.fixture(scope="session")
+def prototype():
+    return load_script("weekend-prototype.py", "weekend_prototype")
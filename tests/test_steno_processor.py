@@ -0,0 +1,166 @@
+"""
+Tests for StenographicProcessor's dictionary caches
+"""
+
+import pickle
+import random
+
+import pytest
+
+TEXT = "you see it because the function failed in court, with the evidence"
+
+def _edit(processor):
+    processor.phonetic_dict["you"] = "yu"
+    processor.phonetic_dict["because"] = "cuz"
+    processor.domain_dict["legal"]["evidence"] = "[EVD]"
+    processor.domain_dict["tech"]["function"] = "[FUN]"
+
+def _fresh_copy(steno, processor):
+    fresh = steno.StenographicProcessor()
+    fresh.phonetic_dict = dict(processor.phonetic_dict)
+    fresh.domain_dict = {domain: dict(words) for domain, words in processor.domain_dict.items()}
+    return fresh
+
+@pytest.mark.parametrize("backend", ["automaton", "regex", "auto"])
+def test_matcher_sees_in_place_edits(steno, processor, backend):
+    """Editing phonetic or domain words in place rebuilds the cached matchers"""
+    for level in steno.COMPRESSION_LEVELS:
+        processor.compress(TEXT, level=level, backend=backend)
+    _edit(processor)
+    fresh = _fresh_copy(steno, processor)
+    for level in steno.COMPRESSION_LEVELS:
+        assert (processor.compress(TEXT, level=level, backend=backend)
+                == fresh.compress(TEXT, level=level, backend=backend))
+    compressed = processor.compress(TEXT, level=4, backend=backend)[0]
+    assert "yu" in compressed and "cuz" in compressed and "[EVD]" in compressed
+
+def test_replaced_and_added_domains(processor):
+    """Assigned dicts and new domains are tracked like the initial ones"""
+    processor.compress(TEXT, level=4)
+    processor.domain_dict["legal"] = {"court": "[CT]"}
+    assert "[CT]" in processor.compress(TEXT, level=4)[0]
+    processor.domain_dict = {"legal": {"evidence": "[E]"}}
+    assert "[E]" in processor.compress(TEXT, level=4)[0]
+    processor.phonetic_dict = {"see": "C"}
+    assert processor.compress(TEXT, level=2)[0].startswith("you C it")
+
+def test_tracked_dicts_pickle(processor):
+    """A pickled processor keeps its (tracked) dictionaries"""
+    _edit(processor)
+    copy = pickle.loads(pickle.dumps(processor))
+    assert copy.compress(TEXT, level=4) == processor.compress(TEXT, level=4)
+    copy.domain_dict["legal"]["court"] = "[CT]"
+    assert "[CT]" in copy.compress(TEXT, level=4)[0]
+
+def test_decompress_sees_in_place_edits(processor):
+    """Reverse phonetic, suffix and domain patterns follow edited values"""
+    assert processor.decompress("u c it bc") == "you see it because"
+    assert processor.decompress_bytes(b"u c it bc") == b"you see it because"
+    assert processor.create_context_aware_symbols("the court saw evidence") == "the court saw [EV]"
+    _edit(processor)
+    processor.suffix_dict["ing"] = "[+NG]"
+    assert processor.decompress("yu c it cuz") == "you see it because"
+    assert processor.decompress_bytes(b"yu c it cuz") == b"you see it because"
+    assert processor.decompress("go[+NG] to [EVD]") == "going to evidence"
+    assert processor.decompress_bytes(b"go[+NG] to [EVD]") == b"going to evidence"
+    assert processor.create_context_aware_symbols("the court saw evidence") == "the court saw [EVD]"
+
+def test_decompress_round_trips_after_edits(steno, processor):
+    """Text compressed after an edit decompresses like on a fresh processor"""
+    processor.decompress(processor.compress(TEXT, level=4)[0])
+    _edit(processor)
+    fresh = _fresh_copy(steno, processor)
+    compressed = processor.compress(TEXT, level=4)[0]
+    assert processor.decompress(compressed) == fresh.decompress(compressed)
+    assert processor.decompress(compressed).startswith("you see it because")
+
+PROSE = ["in order to", "be able to", "would have been", "have been", "machine learning",
+         "because", "you", "the", "working", "is going to", "at this point in time", "United States"]
+PROTECTED = ["```\nin order to be able to\n```", "~~~py\nbecause you\n~~~", "`have been`",
+             "https://example.com/in-order-to?q=machine+learning", "www.be-able-to.org",
+             "you.are@in-order.to", '{"because": ["you", "machine learning"]}',
+             '[{"k": "in order to"}]', "ftp://x.io/would_have_been", "naïve café",
+             "`bc u [IOT] go[+ING]`"]
+
+def _mixed_text(rng, size=30):
+    words = PROSE * 3 + PROTECTED
+    text = ""
+    for _ in range(rng.randint(1, size)):
+        text += rng.choice(words) + rng.choice([" ", " ", ", ", ".\n", "\n\n"])
+    return text
+
+def test_protected_spans(steno):
+    """Code, JSON, URLs and emails are found whole; lookalikes are prose"""
+    text = ("see ```\nin order to\n``` and `x y`, mail a.b@c.io or visit "
+            "https://x.io/a?b=1. Then www.y.org; json {\"a\": [1, \"]\"]} "
+            "and [1, 2] or {x} at 10:30 with [IOT]")
+    spans = [text[start:end] for start, end in steno.protected_spans(text)]
+    assert spans == ["```\nin order to\n```", "`x y`", "a.b@c.io", "https://x.io/a?b=1",
+                     "www.y.org", '{"a": [1, "]"]}']
+    assert steno.protected_spans("cut off ```\nin order to") == [(8, 23)]
+    assert steno.protected_spans('{"open": [1,') == [(0, 12)]
+    assert steno.protected_spans("a `b\nc` d") == []
+
+def _protected(steno, text):
+    return [text[start:end] for start, end in steno.protected_spans(text)]
+
+def test_protected_spans_round_trip(steno, processor):
+    """compress and decompress copy protected spans through byte for byte"""
+    rng = random.Random(43)
+    for _ in range(200):
+        text = _mixed_text(rng)
+        for level in steno.COMPRESSION_LEVELS:
+            compressed = processor.compress(text, level=level)[0]
+            assert _protected(steno, compressed) == _protected(steno, text), (text, level)
+            assert _protected(steno, processor.decompress(compressed)) == _protected(steno, text)
+
+def test_bytes_match_str(steno, processor):
+    """compress_bytes and decompress_bytes equal the str path, also for protected input"""
+    rng = random.Random(44)
+    for _ in range(200):
+        text = _mixed_text(rng, size=12)
+        data = text.encode("utf-8")
+        for level in steno.COMPRESSION_LEVELS:
+            compressed = processor.compress(text, level=level)[0]
+            assert processor.compress_bytes(data, level=level) == compressed.encode("utf-8")
+            assert processor.compress_bytes(memoryview(data), bytearray(b">"), level=level) \
+                == b">" + compressed.encode("utf-8")
+            assert (processor.decompress_bytes(compressed.encode("utf-8"))
+                    == processor.decompress(compressed).encode("utf-8"))
+
+def test_chunked_matches_single_pass(steno, processor, monkeypatch):
+    """Small chunks, with phrases and protected spans across the splits, change nothing"""
+    resyncs = []
+    resync = steno.StenographicProcessor._resync
+    monkeypatch.setattr(steno.StenographicProcessor, "_resync",
+                        staticmethod(lambda *args: resyncs.append(args) or resync(*args)))
+    rng = random.Random(45)
+    with processor.chunk_pool(2) as pool:
+        for _ in range(40):
+            text = _mixed_text(rng, size=60)
+            chunk_size = rng.randint(8, 40)
+            for level in (1, 2, 3, 4):
+                compressed = processor.compress(text, level=level)[0]
+                assert processor.compress_chunked(text, level=level, chunk_size=chunk_size,
+                                                  pool=pool)[0] == compressed, (text, chunk_size)
+                assert (processor.decompress_chunked(compressed, chunk_size=chunk_size, pool=pool)
+                        == processor.decompress(compressed))
+    assert resyncs
+
+def test_profiler_counts_blocks(steno):
+    """Stages report peak memory and the memory blocks they left allocated"""
+    profiler = steno.Profiler(trace_allocations=True)
+    kept = []
+    for _ in range(2):
+        with profiler.call("outer"):
+            with profiler.span("keep"):
+                kept.append([object() for _ in range(1000)])
+            with profiler.span("drop"):
+                [object() for _ in range(1000)]
+    report = profiler.report()
+    assert report["outer/keep"]["calls"] == 2
+    assert report["outer/keep"]["mean_blocks"] >= 1000
+    assert abs(report["outer/drop"]["mean_blocks"]) < 50
+    assert report["outer/drop"]["peak_bytes"] >= 1000 * 16
+    assert report["outer"]["mean_blocks"] >= 1000
+    assert steno.Profiler().report() == {}
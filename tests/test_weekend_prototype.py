@@ -0,0 +1,199 @@
+"""
+Tests for the weekend prototype's bridges
+"""
+
+import random
+from collections import ChainMap
+
+import pytest
+
+WORDS = ("in order to be able the fact that machine learning user interface "
+         "acme widget is going to").split()
+
+def _random_overlay(rng, base):
+    overlay = {}
+    for _ in range(rng.randint(1, 6)):
+        if rng.random() < 0.4:
+            phrase = rng.choice(list(base))
+        else:
+            phrase = " ".join(rng.choice(WORDS) for _ in range(rng.randint(1, 3)))
+        overlay[phrase] = (rng.choice(list(base.values())) if rng.random() < 0.3
+                           else f"[T{rng.randint(0, 9)}]")
+    return overlay
+
+def test_overlay_bridge_matches_chainmap_bridge(prototype):
+    """A tenant bridge behaves like a full bridge over ChainMap(overlay, base)"""
+    rng = random.Random(38)
+    manager = prototype.DictionaryManager()
+    base = manager.base
+    for _ in range(300):
+        overlay = _random_overlay(rng, base)
+        manager.set_overlay("tenant", overlay)
+        bridge = manager.bridge("tenant")
+        reference = prototype.StenographicBridge(ChainMap(overlay, base))
+        assert isinstance(bridge, prototype.OverlayBridge)
+        assert bridge.sorted_compressions == reference.sorted_compressions
+        assert bridge.decompressions == reference.decompressions
+        assert bridge.max_symbol_length >= reference.max_symbol_length
+        for _ in range(5):
+            text = " ".join(rng.choice(WORDS + [word.upper() for word in WORDS] + ["In"])
+                            for _ in range(20))
+            compressed = reference.compress(text)[0]
+            assert bridge.compress(text)[0] == compressed
+            assert bridge.decompress(compressed) == reference.decompress(compressed)
+
+def test_tenant_tables_do_not_grow_with_the_base(prototype):
+    """A tenant's bridge stores its overlay only, however large the base"""
+    sizes = []
+    for base_size in (10, 10000):
+        base = {f"phrase number {n}": f"[P{n}]" for n in range(base_size)}
+        manager = prototype.DictionaryManager(base)
+        manager.set_overlay("acme", {"acme widget": "[AW]", "phrase number 3": "[P3X]"})
+        bridge = manager.bridge("acme")
+        assert bridge.base is manager._base_bridge
+        assert bridge.reverse == {"[AW]": "acme widget", "[P3X]": "phrase number 3"}
+        sizes.append(manager.memory_report()["cached_bridge_bytes"])
+        assert bridge.compress("the acme widget and phrase number 3")[0] == "the [AW] and [P3X]"
+        assert bridge.decompress("[AW] [P3X] [P3] [P4]") == "acme widget phrase number 3 [P3] phrase number 4"
+    assert sizes[0] == sizes[1]
+
+def test_tenants_without_overlay_share_the_base_tables(prototype):
+    """Tenants without an overlay copy the base bridge, not its tables"""
+    manager = prototype.DictionaryManager()
+    bridge = manager.bridge("plain")
+    assert bridge.sorted_compressions is manager._base_bridge.sorted_compressions
+    assert bridge.stats is not manager._base_bridge.stats
+    manager.update_overlay("plain", {"acme widget": "[AW]"})
+    assert manager.compress("plain", "the acme widget is going to ship")[0] == "the [AW] [>] ship"
+    assert manager.compress("other", "the acme widget")[0] == "the acme widget"
+
+def test_streaming_decompressor_on_overlay(prototype):
+    """Symbols split across chunks are expanded with the tenant's table"""
+    manager = prototype.DictionaryManager()
+    manager.set_overlay("acme", {"acme widget": "[ACMEWIDGET]"})
+    decompressor = prototype.StreamingDecompressor(manager.bridge("acme"))
+    chunks = ["the [ACME", "WIDGET] uses [M", "L] now"]
+    out = "".join(decompressor.feed(chunk) for chunk in chunks) + decompressor.flush()
+    assert out == "the acme widget uses machine learning now"
+
+def test_former_bridge_name(prototype):
+    """StenogressiveBridge still names the bridge class"""
+    assert prototype.StenogressiveBridge is prototype.StenographicBridge
+
+def _phrases(bridge):
+    return [pattern for pattern, _ in bridge.sorted_compressions]
+
+def test_streaming_decompressor_matches_decompress(prototype):
+    """Any chunking of a response decompresses like the whole response"""
+    rng = random.Random(42)
+    bridge = prototype.StenographicBridge()
+    symbols = list(bridge.decompressions) + ["[", "]", "[x", "[note]"]
+    for _ in range(200):
+        response = "".join(rng.choice(symbols + ["a ", " ", "word", "\n"])
+                           for _ in range(rng.randint(0, 30)))
+        expected = bridge.decompress(response)
+        for split in range(len(response) + 1):
+            decompressor = prototype.StreamingDecompressor(bridge)
+            out = decompressor.feed(response[:split]) + decompressor.feed(response[split:])
+            assert out + decompressor.flush() == expected, (response, split)
+        decompressor = prototype.StreamingDecompressor(bridge)
+        out = "".join(decompressor.feed(char) for char in response)
+        assert out + decompressor.flush() == expected, response
+
+TEMPLATE = ("Dear {name}, in order to review the machine learning report.\n"
+            "At this point in time the {item} is going to ship; "
+            "with regard to the user interface, see {date}.\n"
+            "Thank you, {name}")
+
+def _templated_prompts(rng, count):
+    names = ["Ada", "Grace", "Alan", "IN ORDER TO", "Machine"]
+    items = ["API", "artificial intelligence model", "dashboard", "return on investment"]
+    prompts = []
+    for _ in range(count):
+        prompt = TEMPLATE.format(name=rng.choice(names), item=rng.choice(items),
+                                 date=f"2024-0{rng.randint(1, 9)}-1{rng.randint(0, 9)}")
+        if rng.random() < 0.3:
+            lines = prompt.split("\n")
+            rng.shuffle(lines)
+            prompt = "\n".join(lines)
+        prompts.append(prompt)
+    return prompts
+
+def test_near_duplicate_cache_matches_bridge(prototype):
+    """Cached compression of templated prompts equals compressing each one"""
+    rng = random.Random(42)
+    bridge = prototype.StenographicBridge()
+    cache = bridge.near_duplicate_cache(capacity=50)
+    for prompt in _templated_prompts(rng, 300):
+        assert cache.get(prompt) == bridge._substitute(prompt), prompt
+    stats = cache.stats()
+    assert stats["near_hits"] > 0 and stats["segment_reuse"] > 0.5
+    assert len(cache) == 50
+
+def test_near_duplicate_cache_matches_processor(steno, processor, prototype):
+    """Built like StenographicTransformer's cache, it equals compress()"""
+    rng = random.Random(43)
+    compress = lambda text: processor.compress(text, aggressive=True)[0]
+    cache = prototype.NearDuplicateCache(
+        compress,
+        phrases=[phrase for phrase, _ in processor.dictionary] + list(processor.phonetic_dict),
+        ignore_case=True,
+        keep_whole=lambda text: bool(processor.protected_spans(text)),
+    )
+    extras = ["", "\n```\nin order to\n```\n", "see `because you`", "https://x.io/in-order-to",
+              '{"machine learning": 1}']
+    for prompt in _templated_prompts(rng, 200):
+        prompt += rng.choice(extras)
+        assert cache.get(prompt) == compress(prompt), prompt
+    # Variants of a cached prompt: a fence around shared lines, and two
+    # new lines whose backticks pair up if they are compressed joined
+    lines = [f"line {n}: in order to ship, because you see it." for n in range(8)]
+    cache.get("\n".join(lines))
+    variants = [lines[:2] + ["```"] + lines[2:5] + ["```"] + lines[5:],
+                lines[:3] + ["see `because."] + lines[3:5]
+                + ["line 4: in order to ship, because` you."] + lines[5:]]
+    for variant in map("\n".join, variants):
+        assert cache.get(variant) == compress(variant), variant
+    assert cache.near_hits
+
+PASSAGES = [
+    "Refunds are issued within 14 days. In order to request a refund, contact support. "
+    "Refunds are issued within 14 days.",
+    "In order to request a refund, contact support with the order number. "
+    "The machine learning team reviews each refund request by hand.\nShipping is free.",
+    "The machine learning team reviews each refund request by hand. "
+    "Refunds are issued within 14 days!",
+]
+
+def test_context_packer_drops_repeats_and_expands(prototype):
+    """Repeated sentences are sent once and the legend expands back"""
+    bridge = prototype.StenographicBridge()
+    packer = prototype.ContextPacker(bridge, min_ngram=2)
+    question = "How long do refunds take?"
+    packed = packer.pack(PASSAGES, question)
+    assert packed.sentences == 8
+    assert (packed.exact_duplicates, packed.near_duplicates) == (2, 1)
+    assert packed.packed_cost < packed.original_cost
+    assert packed.legend and all(symbol.startswith("§") for symbol in packed.legend)
+    kept = ("Refunds are issued within 14 days. "
+            "In order to request a refund, contact support.\n\n"
+            "In order to request a refund, contact support with the order number. "
+            "The machine learning team reviews each refund request by hand. Shipping is free.")
+    header, body = packed.text.split("\n\n", 1)
+    assert header.startswith(prototype.LEGEND_HEADER)
+    assert packed.expand(body) == bridge.compress(kept)[0]
+
+def test_context_packer_legend_marker(prototype):
+    """The legend marker occurs in neither the passages nor the question"""
+    packer = prototype.ContextPacker()
+    packed = packer.pack([passage + " §2" for passage in PASSAGES], "What is ¤?")
+    assert packed.legend and all(symbol.startswith("¶") for symbol in packed.legend)
+    assert not packer.pack(PASSAGES, "§ ¤ ¶").legend
+    rng = random.Random(45)
+    for _ in range(100):
+        passages = [" ".join(rng.choice(["a b", "c d", "§1", "e.", "\n"]) for _ in range(20))
+                    for _ in range(3)]
+        question = rng.choice(["", "¤", "§ ¶"])
+        packed = packer.pack(passages, question)
+        for symbol in packed.legend:
+            assert symbol[0] not in "".join(passages) + question
@@ -13,12 +13,19 @@ This is a DROP-IN wrapper for any LLM API that provides:
 pip install openai anthropic transformers
 """
 
+import copy
 import json
+import operator
+import sys
+import tempfile
 import time
-import hashlib
-from typing import Dict, Any, Optional, Tuple
+import threading
+from collections import ChainMap, Counter, OrderedDict
+from itertools import islice
+from typing import Dict, Any, AsyncIterator, Awaitable, Callable, Iterable, List, Mapping, Optional, Tuple
 from dataclasses import dataclass
 import os
+import re
 
 # You can use this with ANY LLM
 # from openai import OpenAI
@@ -47,13 +54,20 @@ class CompressionStats:
             return 1.0
         return self.original_time_ms / self.compressed_time_ms
 
-class StenogressiveBridge:
+class StenographicBridge:
     """
     The simplest possible bridge that still provides massive speedup.
     Start here. Optimize later.
     """
     
-    def __init__(self):
+    def __init__(self, compressions: Optional[Mapping[str, str]] = None):
+        if compressions is not None:
+            # e.g. DictionaryManager's shared base
+            self.compressions = compressions
+            self._rebuild_tables()
+            self.stats = CompressionStats()
+            return
+        
         # Start with just the most common patterns
         # You can expand this by analyzing your actual usage
         self.compressions = {
@@ -99,7 +113,12 @@ class StenogressiveBridge:
             
             # Add your domain-specific compressions here
         }
+        self._rebuild_tables()
         
+        # Performance tracking
+        self.stats = CompressionStats()
+    
+    def _rebuild_tables(self):
         # Sort by length (longest first) to avoid partial replacements
         self.sorted_compressions = sorted(
             self.compressions.items(),
@@ -109,26 +128,58 @@ class StenogressiveBridge:
         
         # Reverse mapping for decompression
         self.decompressions = {v: k for k, v in self.compressions.items()}
-        
-        # Performance tracking
-        self.stats = CompressionStats()
+        self.max_symbol_length = max(map(len, self.decompressions), default=0)
+        self._reverse_index = None
+    
+    def reverse_index(self) -> Tuple[Dict[str, int], Dict[str, List[Tuple[int, str]]]]:
+        """
+        (phrase -> position, symbol -> [(position, phrase)]) in compressions
+        order; built on first use, for OverlayBridges on this bridge
+        """
+        if self._reverse_index is None:
+            positions = {}
+            phrases_by_symbol = {}
+            for position, (phrase, symbol) in enumerate(self.compressions.items()):
+                positions[phrase] = position
+                phrases_by_symbol.setdefault(symbol, []).append((position, phrase))
+            self._reverse_index = (positions, phrases_by_symbol)
+        return self._reverse_index
     
     def compress(self, text: str) -> Tuple[str, float]:
         """Compress text using stenographic patterns"""
-        original_length = len(text)
+        return self._count(text, self._substitute(text))
+    
+    def _substitute(self, text: str) -> str:
         compressed = text
         
         # Apply compressions (longest patterns first)
         for pattern, symbol in self.sorted_compressions:
-            compressed = compressed.replace(pattern, symbol)
-            # Case-insensitive version
-            compressed = compressed.replace(pattern.capitalize(), symbol)
-            compressed = compressed.replace(pattern.upper(), symbol)
+            compressed = self._replace(compressed, pattern, symbol)
         
-        compression_ratio = original_length / len(compressed) if compressed else 1.0
+        return compressed
+    
+    @staticmethod
+    def _replace(text: str, pattern: str, symbol: str) -> str:
+        text = text.replace(pattern, symbol)
+        # Case-insensitive version
+        text = text.replace(pattern.capitalize(), symbol)
+        return text.replace(pattern.upper(), symbol)
+    
+    def near_duplicate_cache(self, **options) -> "NearDuplicateCache":
+        """A NearDuplicateCache for this bridge's current tables"""
+        return NearDuplicateCache(
+            self._substitute,
+            phrases=[variant for pattern, _ in self.sorted_compressions
+                     for variant in (pattern, pattern.capitalize(), pattern.upper())],
+            symbols=self.decompressions,
+            **options,
+        )
+    
+    def _count(self, text: str, compressed: str) -> Tuple[str, float]:
+        compression_ratio = len(text) / len(compressed) if compressed else 1.0
         
         # Update stats
-        self.stats.original_tokens += original_length // 4  # Rough token estimate
+        self.stats.original_tokens += len(text) // 4  # Rough token estimate
         self.stats.compressed_tokens += len(compressed) // 4
         
         return compressed, compression_ratio
@@ -158,9 +209,6 @@ class StenogressiveBridge:
         Returns:
             Dict with response and performance metrics
         """
-        # Measure original processing time (estimated)
-        original_estimated_time = len(prompt) * 0.002  # ~2ms per token estimate
-        
         # Compress the prompt
         start_time = time.time()
         compressed_prompt, compression_ratio = self.compress(prompt)
@@ -176,8 +224,56 @@ class StenogressiveBridge:
         final_response = self.decompress(compressed_response)
         decompression_time = time.time() - decompression_start
         
-        # Calculate metrics
         total_time = compression_time + llm_time + decompression_time
+        return self._record(prompt, compressed_prompt, compression_ratio, final_response, total_time)
+    
+    async def process_with_llm_async(self,
+                                     prompt: str,
+                                     llm_function: Callable[..., Awaitable[str]],
+                                     **kwargs) -> Dict[str, Any]:
+        """
+        process_with_llm for async LLM clients: llm_function is awaited, so
+        one event loop can keep many requests in flight.
+        """
+        start_time = time.time()
+        compressed_prompt, compression_ratio = self.compress(prompt)
+        compressed_response = await llm_function(compressed_prompt, **kwargs)
+        final_response = self.decompress(compressed_response)
+        total_time = time.time() - start_time
+        return self._record(prompt, compressed_prompt, compression_ratio, final_response, total_time)
+    
+    async def stream_with_llm(self,
+                              prompt: str,
+                              llm_stream: Callable[..., AsyncIterator[str]],
+                              **kwargs) -> AsyncIterator[str]:
+        """
+        Streaming variant: llm_stream yields response chunks, which are
+        decompressed as they arrive (see StreamingDecompressor). Stats are
+        recorded when the stream ends.
+        """
+        start_time = time.time()
+        compressed_prompt, compression_ratio = self.compress(prompt)
+        decompressor = StreamingDecompressor(self)
+        parts = []
+        async for chunk in llm_stream(compressed_prompt, **kwargs):
+            text = decompressor.feed(chunk)
+            if text:
+                parts.append(text)
+                yield text
+        text = decompressor.flush()
+        if text:
+            parts.append(text)
+            yield text
+        self._record(prompt, compressed_prompt, compression_ratio, "".join(parts),
+                     time.time() - start_time)
+    
+    def _record(self, prompt: str, compressed_prompt: str, compression_ratio: float,
+                final_response: str, total_time: float) -> Dict[str, Any]:
+        """Update stats for one request and build the process_with_llm result"""
+        # Measure original processing time (estimated)
+        original_estimated_time = len(prompt) * 0.002  # ~2ms per token estimate
+        
+        # Calculate metrics
         self.stats.compressed_time_ms += total_time * 1000
         self.stats.original_time_ms += original_estimated_time * 1000
         
@@ -202,6 +298,461 @@ class StenogressiveBridge:
             "stats": self.stats
         }
 
+# Former name, kept for existing imports
+StenogressiveBridge = StenographicBridge
+
+class StreamingDecompressor:
+    """
+    Incremental decompress for streamed responses. A chunk may end partway
+    through a symbol ("...the [A" + "I] model"), so text from an unclosed
+    "[" is held back until the symbol completes or grows longer than any
+    symbol could be.
+    """
+    
+    def __init__(self, bridge: StenographicBridge):
+        self.bridge = bridge
+        self.max_symbol = bridge.max_symbol_length
+        self.pending = ""
+    
+    def feed(self, chunk: str) -> str:
+        text = self.pending + chunk
+        cut = text.rfind("[")
+        if cut != -1 and "]" not in text[cut:] and len(text) - cut < self.max_symbol:
+            text, self.pending = text[:cut], text[cut:]
+        else:
+            self.pending = ""
+        return self.bridge.decompress(text)
+    
+    def flush(self) -> str:
+        text, self.pending = self.pending, ""
+        return self.bridge.decompress(text)
+
+# A prompt may be cut into reusable segments after clause punctuation or at
+# a line break
+CLAUSE_END = ".,;:!?)]\"'"
+
+# Whitespace inside a phrase, with a character on each side
+PHRASE_GAP = re.compile(r'(?<=\S)\s+(?=\S)')
+
+# Joins the segments compressed in one call; no phrase can match across it
+SEGMENT_SEPARATOR = "\x00"
+
+# Most recent entries per LSH bucket compared against a new prompt; a
+# popular template puts every prompt in the same buckets
+BUCKET_CANDIDATES = 8
+
+def minhash_signature(items: Iterable, num_perm: int) -> Tuple[int, ...]:
+    """
+    One-permutation MinHash over distinct hashable items, with empty bins
+    filled from the next non-empty bin (rotation densification).
+    """
+    bins = [None] * num_perm
+    for item in items:
+        value = hash(item) & 0xFFFFFFFFFFFFFFFF
+        slot, value = value % num_perm, value // num_perm
+        if bins[slot] is None or value < bins[slot]:
+            bins[slot] = value
+    for slot in range(num_perm):
+        if bins[slot] is None:
+            for distance in range(1, num_perm):
+                value = bins[(slot + distance) % num_perm]
+                if value is not None:
+                    # Offset by distance so borrowed values only collide
+                    # with values borrowed the same way
+                    bins[slot] = value + (distance << 64)
+                    break
+    return tuple(bins)
+
+def band_keys(signature: Tuple[int, ...], bands: int) -> List[Tuple]:
+    """LSH bucket keys: the signature cut into bands, tagged with the band"""
+    rows = len(signature) // bands
+    return [(band,) + signature[band * rows:(band + 1) * rows] for band in range(bands)]
+
+class NearDuplicateCache:
+    """
+    Compression cache that also reuses work across near-identical prompts
+    (same template, different name or date).
+    
+    Prompts are cut into segments after clause punctuation and at line
+    breaks, wherever no phrase can match across the cut, so compressing
+    segment by segment gives exactly what compressing the whole prompt
+    would. Recent prompts are indexed by a MinHash signature over their
+    segments, banded for LSH; on a miss the most similar recent prompt
+    donates its compressed segments and only the segments it does not
+    share are compressed.
+    
+    compress is the raw text -> compressed function and phrases every
+    string it replaces (with any case variants it matches). symbols is
+    everything it may write, needed only when its output is matched again
+    (chained replaces, as in StenographicBridge); leave it empty for a
+    single-pass compressor.
+    
+    keep_whole marks text the compressor treats by context (e.g. code or
+    JSON it copies through, see StenographicProcessor.protected_spans):
+    such prompts are never cut, and a batch of missing segments it flags
+    is compressed one segment per call instead of joined.
+    """
+    
+    def __init__(self, compress: Callable[[str], str], phrases: Iterable[str],
+                 symbols: Iterable[str] = (), ignore_case: bool = False,
+                 capacity: int = 10_000, num_perm: int = 32, bands: int = 8,
+                 threshold: float = 0.5, keep_whole: Optional[Callable[[str], bool]] = None):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.compress = compress
+        self.keep_whole = keep_whole
+        self.ignore_case = ignore_case
+        self.capacity = capacity
+        self.num_perm = num_perm
+        self.bands = bands
+        self.threshold = threshold
+        
+        # Character pairs a phrase joins across whitespace; a cut between
+        # them (or next to a symbol that could end up there) is unsafe
+        fold = str.lower if ignore_case else (lambda text: text)
+        phrases = [fold(phrase) for phrase in phrases]
+        symbols = [fold(symbol) for symbol in symbols]
+        self._cuttable = all(phrases) and all(symbols) and not any(
+            SEGMENT_SEPARATOR in value for value in phrases + symbols)
+        # A phrase that starts or ends with punctuation could match
+        # differently once a cut splits "word, " from the next word
+        self._strict = False
+        pairs = set()
+        for phrase in filter(None, phrases):
+            if phrase[0].isspace() or phrase[-1].isspace():
+                self._cuttable = False
+            self._strict |= not (phrase[0].isalnum() and phrase[-1].isalnum())
+            for gap in PHRASE_GAP.finditer(phrase):
+                pairs.add((phrase[gap.start() - 1], phrase[gap.end()]))
+        ends = {symbol[-1] for symbol in symbols if symbol}
+        starts = {symbol[0] for symbol in symbols if symbol}
+        if any(left in ends and right in starts for left, right in pairs):
+            self._cuttable = False
+        self._cut = self._cut_pattern(pairs, ends, starts)
+        
+        # text -> (compressed, {segment: compressed segment}, signature), LRU
+        self._entries: "OrderedDict[str, Tuple[str, Dict[str, str], Tuple[int, ...]]]" = OrderedDict()
+        self._buckets: Dict[Tuple, Dict[str, None]] = {}  # insertion-ordered sets
+        self.hits = self.near_hits = self.misses = 0
+        self.segments_reused = self.segments_compressed = 0
+    
+    def get(self, text: str) -> str:
+        """Compressed text, from the exact or a near-duplicate entry if possible"""
+        entry = self._entries.get(text)
+        if entry is not None:
+            self._entries.move_to_end(text)
+            self.hits += 1
+            return entry[0]
+        
+        segments = self._segments(text)
+        signature = self._signature(segments)
+        donor = self._nearest(signature) if len(segments) > 1 else None
+        known = donor[1] if donor is not None else {}
+        
+        # Everything the donor lacks is compressed in one call
+        missing = list(dict.fromkeys(segment for segment in segments if segment not in known))
+        table = {segment: known[segment] for segment in segments if segment in known}
+        if missing:
+            joined = SEGMENT_SEPARATOR.join(missing)
+            if len(missing) > 1 and self.keep_whole is not None and self.keep_whole(joined):
+                # Joining paired up markers from different segments
+                pieces = [self.compress(segment) for segment in missing]
+            else:
+                pieces = self.compress(joined).split(SEGMENT_SEPARATOR)
+            table.update(zip(missing, pieces))
+        compressed = "".join(table[segment] for segment in segments)
+        self.segments_compressed += len(missing)
+        self.segments_reused += len(segments) - len(missing)
+        if donor is not None:
+            self.near_hits += 1
+        else:
+            self.misses += 1
+        
+        self._entries[text] = (compressed, table, signature)
+        for key in self._band_keys(signature):
+            self._buckets.setdefault(key, {})[text] = None
+        while len(self._entries) > self.capacity:
+            self._evict()
+        return compressed
+    
+    def _cut_pattern(self, pairs, ends, starts):
+        """
+        Zero-width matches at the start of every whitespace run that is
+        safe to cut at: no phrase joins the characters on either side, and
+        neither side could instead be the end or start of a symbol a phrase
+        continues from. Excluding every left (or every right) character of
+        the pairs keeps this a character-class test.
+        """
+        def chars(values):
+            return "".join(map(re.escape, sorted(values)))
+        before_symbol = {left for left, right in pairs if right in starts}
+        after_symbol = {right for left, right in pairs if left in ends}
+        sides = [(before_symbol | {left for left, _ in pairs}, after_symbol),
+                 (before_symbol, after_symbol | {right for _, right in pairs})]
+        clause_cuts, line_cuts = [], []
+        for unsafe_left, unsafe_right in sides:
+            right = f"[^\\s{chars(unsafe_right)}]"
+            if self._strict:
+                # Only cut after a letter or digit, see __init__
+                left = f"[^\\W_{chars(unsafe_left)}]"
+            else:
+                left = f"[^\\s{chars(unsafe_left)}]"
+                clause = chars(set(CLAUSE_END) - unsafe_left)
+                if clause:
+                    clause_cuts.append(f"(?<=[{clause}])(?=\\s+{right})")
+            line_cuts.append(f"(?<={left})(?=\\s*{right})")
+        # Cheap tests first: most positions fail them
+        pattern = f"(?=[^\\S\\n]*\\n)(?:{'|'.join(line_cuts)})"
+        if clause_cuts:
+            pattern = f"(?<=[{chars(CLAUSE_END)}])(?:{'|'.join(clause_cuts)})|{pattern}"
+        return re.compile(f"(?=\\s)(?:{pattern})", re.IGNORECASE if self.ignore_case else 0)
+    
+    def _segments(self, text: str) -> List[str]:
+        if (not self._cuttable or SEGMENT_SEPARATOR in text
+                or (self.keep_whole is not None and self.keep_whole(text))):
+            return [text]
+        return self._cut.split(text)
+    
+    def _signature(self, segments: List[str]) -> Tuple[int, ...]:
+        return minhash_signature(set(segments), self.num_perm)
+    
+    def _band_keys(self, signature: Tuple[int, ...]) -> List[Tuple]:
+        return band_keys(signature, self.bands)
+    
+    def _nearest(self, signature: Tuple[int, ...]):
+        """The indexed entry most similar to signature, if above threshold"""
+        # Rank candidates by shared bands; check only the best one in full
+        votes: Dict[str, int] = {}
+        for key in self._band_keys(signature):
+            bucket = self._buckets.get(key)
+            if bucket:
+                for text in islice(reversed(bucket), BUCKET_CANDIDATES):
+                    votes[text] = votes.get(text, 0) + 1
+        if not votes:
+            return None
+        best = max(votes, key=votes.__getitem__)
+        entry = self._entries[best]
+        if sum(map(operator.eq, entry[2], signature)) < self.threshold * self.num_perm:
+            return None
+        self._entries.move_to_end(best)
+        return entry
+    
+    def _evict(self):
+        text, (_, _, signature) = self._entries.popitem(last=False)
+        for key in self._band_keys(signature):
+            bucket = self._buckets[key]
+            del bucket[text]
+            if not bucket:
+                del self._buckets[key]
+    
+    def clear(self):
+        self._entries.clear()
+        self._buckets.clear()
+    
+    def __len__(self) -> int:
+        return len(self._entries)
+    
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.near_hits + self.misses
+        segments = self.segments_reused + self.segments_compressed
+        return {
+            "entries": len(self._entries),
+            "exact_hits": self.hits,
+            "near_hits": self.near_hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits + self.near_hits) / lookups if lookups else 0.0,
+            "segment_reuse": self.segments_reused / segments if segments else 0.0,
+        }
+
+# ContextPacker cuts passages into sentences after terminal punctuation
+# and at line breaks
+SENTENCE_BREAK = re.compile(r'(?<=[.!?])\s+|\s*\n\s*')
+
+# Prefixes tried in turn for a request's legend symbols (§1, §2, ...); the
+# first that does not occur in the request is used
+LEGEND_MARKERS = ("§", "¤", "¶")
+LEGEND_HEADER = "Legend:\n"
+
+@dataclass
+class PackedContext:
+    """One request's passages as packed by ContextPacker.pack"""
+    text: str
+    legend: Dict[str, str]
+    sentences: int = 0
+    exact_duplicates: int = 0
+    near_duplicates: int = 0
+    original_cost: float = 0
+    packed_cost: float = 0
+    
+    def expand(self, text: str) -> str:
+        """
+        Replace the legend's symbols in text (e.g. a response quoting them)
+        with their phrases, where they stand between whitespace
+        """
+        if not self.legend:
+            return text
+        symbols = "|".join(map(re.escape, sorted(self.legend, key=len, reverse=True)))
+        return re.sub(f"(?<!\\S)(?:{symbols})(?!\\S)", lambda m: self.legend[m.group(0)], text)
+
+class ContextPacker:
+    """
+    Pack the passages retrieved for one request into a single compressed
+    context, so boilerplate shared between passages is sent once.
+    
+    Sentences repeated across passages are dropped, keeping the first:
+    exact repeats by the hash of the case- and whitespace-folded sentence,
+    near repeats (word 3-shingle Jaccard of at least near_threshold) found
+    through MinHash LSH. The rest is compressed with the bridge, and word
+    n-grams still repeated within the request become a temporary
+    dictionary, sent as an inline legend ahead of the passages.
+    
+    cost_model is anything with a cost(text) method (e.g. the processor's
+    TokenCostModel); by default ~4 characters per token. An entry is only
+    added if its replacements save more than its legend line costs, and
+    the legend only if the entries together pay for its header.
+    """
+    
+    def __init__(self, bridge: Optional[StenographicBridge] = None, cost_model=None,
+                 near_threshold: float = 0.6, min_ngram: int = 2, max_ngram: int = 8,
+                 max_entries: int = 32, num_perm: int = 16, bands: int = 8,
+                 separator: str = "\n\n"):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.bridge = StenographicBridge() if bridge is None else bridge
+        self.cost = cost_model.cost if cost_model is not None else (lambda text: len(text) / 4)
+        self.near_threshold = near_threshold
+        self.min_ngram = min_ngram
+        self.max_ngram = max_ngram
+        self.max_entries = max_entries
+        self.num_perm = num_perm
+        self.bands = bands
+        self.separator = separator
+    
+    def pack(self, passages: Iterable[str], question: str = "") -> PackedContext:
+        """
+        Pack passages. question is what is sent along with them; the legend
+        marker is chosen so its symbols occur in neither.
+        """
+        passages = list(passages)
+        packed = PackedContext("", {}, original_cost=self.cost(self.separator.join(passages)))
+        seen = set()
+        kept_shingles: List[frozenset] = []
+        buckets: Dict[Tuple, List[int]] = {}
+        kept_passages = []
+        for passage in passages:
+            kept = []
+            for sentence in SENTENCE_BREAK.split(passage.strip()):
+                if not sentence:
+                    continue
+                packed.sentences += 1
+                words = sentence.lower().split()
+                key = " ".join(words)
+                if key in seen:
+                    packed.exact_duplicates += 1
+                    continue
+                shingles = frozenset(zip(words, words[1:], words[2:])) or frozenset([key])
+                keys = band_keys(minhash_signature(shingles, self.num_perm), self.bands)
+                if self._near(shingles, keys, buckets, kept_shingles):
+                    packed.near_duplicates += 1
+                    continue
+                seen.add(key)
+                for band_key in keys:
+                    buckets.setdefault(band_key, []).append(len(kept_shingles))
+                kept_shingles.append(shingles)
+                kept.append(sentence)
+            if kept:
+                kept_passages.append(" ".join(kept))
+        
+        body, _ = self.bridge.compress(self.separator.join(kept_passages))
+        body, packed.legend = self._legend(body, question)
+        if packed.legend:
+            body = (LEGEND_HEADER + "".join(f"{symbol}={phrase}\n"
+                                            for symbol, phrase in packed.legend.items())
+                    + "\n" + body)
+        packed.text = body
+        packed.packed_cost = self.cost(body)
+        return packed
+    
+    def _near(self, shingles: frozenset, keys: List[Tuple], buckets: Dict[Tuple, List[int]],
+              kept_shingles: List[frozenset]) -> bool:
+        """Whether a kept sentence sharing an LSH bucket is similar enough"""
+        candidates = set()
+        for band_key in keys:
+            candidates.update(buckets.get(band_key, ()))
+        for index in candidates:
+            other = kept_shingles[index]
+            if len(shingles & other) >= self.near_threshold * len(shingles | other):
+                return True
+        return False
+    
+    def _legend(self, text: str, question: str = "") -> Tuple[str, Dict[str, str]]:
+        """
+        Replace repeated n-grams of text with legend symbols, greedily by
+        estimated saving, recounting each one on the text as replaced so
+        far; returns (text, {symbol: phrase}). The marker must not occur in
+        text or question, which share the prompt with the legend.
+        """
+        marker = next((marker for marker in LEGEND_MARKERS
+                       if marker not in text and marker not in question), None)
+        if marker is None:
+            return text, {}
+        counts = Counter()
+        for line in text.split("\n"):
+            words = line.split()
+            for n in range(self.min_ngram, self.max_ngram + 1):
+                counts.update(zip(*(words[i:] for i in range(n))))
+        cost = self.cost
+        sample = f"{marker}{self.max_entries}"
+        estimates = []
+        for words, count in counts.items():
+            if count > 1:
+                phrase = " ".join(words)
+                saving = (count * (cost(phrase) - cost(sample))
+                          - cost(f"{sample}={phrase}\n"))
+                if saving > 0:
+                    estimates.append((saving, phrase))
+        estimates.sort(reverse=True)
+        
+        packed, legend, saved = text, {}, 0.0
+        for _, phrase in estimates[:4 * self.max_entries]:
+            if len(legend) == self.max_entries:
+                break
+            symbol = f"{marker}{len(legend) + 1}"
+            pattern = re.compile(r'(?<!\S)' + re.escape(phrase) + r'(?!\S)')
+            occurrences = len(pattern.findall(packed))
+            saving = (occurrences * (cost(phrase) - cost(symbol))
+                      - cost(f"{symbol}={phrase}\n"))
+            if occurrences > 1 and saving > 0:
+                packed = pattern.sub(symbol, packed)
+                legend[symbol] = phrase
+                saved += saving
+        if saved <= cost(LEGEND_HEADER + "\n"):
+            return text, {}
+        return packed, legend
+    
+    def process_with_llm(self, question: str, passages: Iterable[str],
+                         llm_function: callable, **kwargs) -> Dict[str, Any]:
+        """
+        Like StenographicBridge.process_with_llm for a question over
+        retrieved passages, sent as one packed context.
+        """
+        start_time = time.time()
+        passages = list(passages)
+        packed = self.pack(passages, question)
+        compressed_question, _ = self.bridge.compress(question)
+        prompt = packed.text + self.separator + compressed_question if packed.text else compressed_question
+        response = llm_function(prompt, **kwargs)
+        final_response = self.bridge.decompress(packed.expand(response))
+        original = self.separator.join(passages + [question])
+        compression_ratio = len(original) / len(prompt) if prompt else 1.0
+        result = self.bridge._record(original, prompt, compression_ratio, final_response,
+                                     time.time() - start_time)
+        result["context"] = packed
+        return result
+
+# Seconds between DictionaryReloader checks of the dictionary file
+RELOAD_INTERVAL = 5.0
+
 class ProductionBridge(StenographicBridge):
     """
     Production-ready version with caching, learning, and optimization
@@ -210,7 +761,6 @@ class ProductionBridge(StenographicBridge):
     def __init__(self, cache_dir: str = ".steno_cache"):
         super().__init__()
         self.cache_dir = cache_dir
-        self.compression_cache = {}
         self.pattern_frequency = {}
         os.makedirs(cache_dir, exist_ok=True)
         self._load_learned_patterns()
@@ -222,12 +772,7 @@ class ProductionBridge(StenographicBridge):
             with open(pattern_file, 'r') as f:
                 learned = json.load(f)
                 self.compressions.update(learned)
-                self.sorted_compressions = sorted(
-                    self.compressions.items(),
-                    key=lambda x: len(x[0]),
-                    reverse=True
-                )
-                self.decompressions = {v: k for k, v in self.compressions.items()}
+                self._rebuild_tables()
     
     def learn_from_text(self, text: str, min_frequency: int = 3):
         """
@@ -265,20 +810,438 @@ class ProductionBridge(StenographicBridge):
         with open(pattern_file, 'w') as f:
             json.dump(self.compressions, f)
     
+    def _rebuild_tables(self):
+        super()._rebuild_tables()
+        # Cached output is only valid for the tables it was produced with
+        self.compression_cache = self.near_duplicate_cache()
+    
     def compress_with_cache(self, text: str) -> Tuple[str, float]:
-        """Compress with caching for repeated content"""
-        # Check cache
-        text_hash = hashlib.md5(text.encode()).hexdigest()
-        if text_hash in self.compression_cache:
-            return self.compression_cache[text_hash]
+        """Compress with caching for repeated and near-duplicate content"""
+        return self._count(text, self.compression_cache.get(text))
+    
+    def hot_reload(self, interval: float = RELOAD_INTERVAL, **options) -> "DictionaryReloader":
+        """
+        A started DictionaryReloader for this bridge's patterns.json. Serve
+        requests through it to pick up a new dictionary without a restart.
+        """
+        return DictionaryReloader(os.path.join(self.cache_dir, "patterns.json"), bridge=self,
+                                  interval=interval, **options).start()
+
+class OverlayBridge(StenographicBridge):
+    """
+    A small overlay of extra or overriding patterns on a shared base
+    bridge. Only the overlay's part of the tables is built and stored;
+    the base's sorted table and reverse map are read in place, so memory
+    and build time follow the overlay's size, not the base's.
+    
+    Compression gives the same output as a StenographicBridge over
+    ChainMap(overlay, base). Decompression expands the symbols the overlay
+    touches before the base's, which only differs when one symbol
+    contains another.
+    """
+    
+    def __init__(self, base: StenographicBridge, overlay: Mapping[str, str]):
+        self.base = base
+        self.overlay = dict(overlay)
+        self.compressions = ChainMap(self.overlay, base.compressions)
+        self._rebuild_tables()
+        self.stats = CompressionStats()
+    
+    def _rebuild_tables(self):
+        base_compressions = self.base.compressions
+        # Base phrases with a new symbol, and phrases the base lacks (longest
+        # first; sorted is stable, so ties keep overlay order like ChainMap)
+        self.overrides = {phrase: symbol for phrase, symbol in self.overlay.items()
+                          if phrase in base_compressions and base_compressions[phrase] != symbol}
+        self.extra = sorted(((phrase, symbol) for phrase, symbol in self.overlay.items()
+                             if phrase not in base_compressions),
+                            key=lambda x: len(x[0]), reverse=True)
         
-        # Compress
-        result = self.compress(text)
+        # Symbols whose phrase may differ from the base's: the ones overridden
+        # phrases had and got, and the extra phrases'
+        self.touched = ({base_compressions[phrase] for phrase in self.overrides}
+                        | set(self.overrides.values()) | {symbol for _, symbol in self.extra})
+        # As in the merged reverse map, the last phrase (base order, then
+        # overlay order) to use a symbol wins
+        positions, phrases_by_symbol = self.base.reverse_index()
+        extra_phrases = {symbol: phrase for phrase, symbol in self.overlay.items()
+                         if phrase not in base_compressions}
+        self.reverse = {}
+        for symbol in self.touched:
+            if symbol in extra_phrases:
+                self.reverse[symbol] = extra_phrases[symbol]
+                continue
+            users = [(position, phrase) for position, phrase in phrases_by_symbol.get(symbol, ())
+                     if phrase not in self.overrides]
+            users += [(positions[phrase], phrase) for phrase, new in self.overrides.items()
+                      if new == symbol]
+            if users:
+                self.reverse[symbol] = max(users)[1]
+        # An upper bound (a removed base symbol may be the longest), which
+        # is all StreamingDecompressor needs
+        self.max_symbol_length = max(self.base.max_symbol_length,
+                                     max(map(len, self.reverse), default=0))
+    
+    @property
+    def sorted_compressions(self) -> List[Tuple[str, str]]:
+        """The merged table, built on each access (e.g. for near_duplicate_cache)"""
+        overrides = self.overrides
+        merged = [(phrase, overrides.get(phrase, symbol))
+                  for phrase, symbol in self.base.sorted_compressions]
+        return sorted(merged + self.extra, key=lambda x: len(x[0]), reverse=True)
+    
+    @property
+    def decompressions(self) -> Dict[str, str]:
+        """The merged reverse map, built on each access"""
+        merged = dict(self.reverse)
+        for symbol, phrase in self.base.decompressions.items():
+            if symbol not in self.touched:
+                merged[symbol] = phrase
+        return merged
+    
+    def _substitute(self, text: str) -> str:
+        # Merge the base table with the extra phrases by length; on ties the
+        # base phrase goes first, as in the ChainMap's order
+        overrides = self.overrides
+        extra = self.extra
+        replace = self._replace
+        next_extra = 0
+        for pattern, symbol in self.base.sorted_compressions:
+            while next_extra < len(extra) and len(extra[next_extra][0]) > len(pattern):
+                text = replace(text, *extra[next_extra])
+                next_extra += 1
+            text = replace(text, pattern, overrides.get(pattern, symbol))
+        for pattern, symbol in extra[next_extra:]:
+            text = replace(text, pattern, symbol)
+        return text
+    
+    def decompress(self, text: str) -> str:
+        for symbol, pattern in self.reverse.items():
+            text = text.replace(symbol, pattern)
+        touched = self.touched
+        for symbol, pattern in self.base.decompressions.items():
+            if symbol not in touched:
+                text = text.replace(symbol, pattern)
+        return text
+
+class DictionaryManager:
+    """
+    Serve many tenants from one process: one immutable base dictionary
+    shared by all, plus a small overlay of extra or overriding patterns
+    per tenant.
+    
+    Each tenant's bridge is an OverlayBridge on the shared base bridge,
+    built on first use and cached per (base version, overlay version).
+    Cold tenants are evicted least recently used first once the cached
+    bridges exceed max_bytes.
+    """
+    
+    def __init__(self, base: Optional[Mapping[str, str]] = None,
+                 max_bytes: int = 256 * 1024 * 1024, max_bridges: Optional[int] = None):
+        self.max_bytes = max_bytes
+        self.max_bridges = max_bridges
+        self.base_version = 0
+        self.overlays: Dict[str, Dict[str, str]] = {}
+        self.overlay_versions: Dict[str, int] = {}
+        # tenant -> (base version, overlay version, bridge, estimated bytes)
+        self._bridges = OrderedDict()
+        self._cached_bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.set_base(StenographicBridge().compressions if base is None else base)
+    
+    def set_base(self, compressions: Mapping[str, str]):
+        """Replace the shared base; every tenant's bridge is rebuilt on next use."""
+        # Stored longest first (stable, so ties keep their order), which
+        # matches sorting the base in its original order
+        ordered = dict(sorted(compressions.items(), key=lambda x: len(x[0]), reverse=True))
+        # Every tenant reads its tables; overlays only add their own part
+        base_bridge = StenographicBridge(ordered)
+        base_bridge.reverse_index()
+        with self._lock:
+            self.base = ordered
+            self._base_bridge = base_bridge
+            self.base_version += 1
+            self._bridges.clear()
+            self._cached_bytes = 0
+    
+    def set_overlay(self, tenant: str, compressions: Mapping[str, str]):
+        """Replace a tenant's overlay."""
+        with self._lock:
+            self.overlays[tenant] = dict(compressions)
+            self._bump(tenant)
+    
+    def update_overlay(self, tenant: str, compressions: Mapping[str, str]):
+        """Add or override patterns in a tenant's overlay."""
+        with self._lock:
+            self.overlays.setdefault(tenant, {}).update(compressions)
+            self._bump(tenant)
+    
+    def load_overlay(self, tenant: str, path: str):
+        """Load a tenant overlay from a patterns.json file."""
+        with open(path, 'r') as f:
+            self.set_overlay(tenant, json.load(f))
+    
+    def remove_tenant(self, tenant: str):
+        with self._lock:
+            self.overlays.pop(tenant, None)
+            self.overlay_versions.pop(tenant, None)
+            self._drop(tenant)
+    
+    def _bump(self, tenant: str):
+        self.overlay_versions[tenant] = self.overlay_versions.get(tenant, 0) + 1
+        self._drop(tenant)
+    
+    def _drop(self, tenant: str):
+        entry = self._bridges.pop(tenant, None)
+        if entry is not None:
+            self._cached_bytes -= entry[3]
+    
+    def bridge(self, tenant: str) -> StenographicBridge:
+        """The tenant's bridge, built on a cache miss."""
+        with self._lock:
+            base_version = self.base_version
+            overlay_version = self.overlay_versions.get(tenant, 0)
+            entry = self._bridges.get(tenant)
+            if entry is not None and entry[:2] == (base_version, overlay_version):
+                self._bridges.move_to_end(tenant)
+                self.hits += 1
+                return entry[2]
+            self.misses += 1
+            base_bridge = self._base_bridge
+            overlay = self.overlays.get(tenant)
         
-        # Cache result
-        self.compression_cache[text_hash] = result
+        # Build outside the lock; a concurrent build of the same tenant is
+        # harmless, the last one is cached
+        if overlay:
+            bridge = OverlayBridge(base_bridge, overlay)
+            size = self._estimate_bytes(bridge)
+        else:
+            # Own stats, shared tables
+            bridge = copy.copy(base_bridge)
+            bridge.stats = CompressionStats()
+            size = sys.getsizeof(bridge) + sys.getsizeof(bridge.__dict__)
         
+        with self._lock:
+            if (base_version, overlay_version) == (self.base_version,
+                                                   self.overlay_versions.get(tenant, 0)):
+                self._drop(tenant)
+                self._bridges[tenant] = (base_version, overlay_version, bridge, size)
+                self._cached_bytes += size
+                self._evict()
+        return bridge
+    
+    @staticmethod
+    def _estimate_bytes(bridge: OverlayBridge) -> int:
+        """
+        Bytes owned by one tenant's bridge: its overlay and the tables built
+        from it, plus the overlay's strings. The base's tables and strings
+        are shared and not counted.
+        """
+        size = sys.getsizeof(bridge) + sys.getsizeof(bridge.__dict__)
+        for table in (bridge.overlay, bridge.overrides, bridge.extra, bridge.touched, bridge.reverse):
+            size += sys.getsizeof(table)
+        size += len(bridge.extra) * sys.getsizeof(("", ""))
+        for phrase, symbol in bridge.overlay.items():
+            size += sys.getsizeof(phrase) + sys.getsizeof(symbol)
+        return size
+    
+    def _evict(self):
+        while self._bridges and (
+                self._cached_bytes > self.max_bytes
+                or (self.max_bridges is not None and len(self._bridges) > self.max_bridges)):
+            _, entry = self._bridges.popitem(last=False)
+            self._cached_bytes -= entry[3]
+            self.evictions += 1
+    
+    def compress(self, tenant: str, text: str) -> Tuple[str, float]:
+        return self.bridge(tenant).compress(text)
+    
+    def decompress(self, tenant: str, text: str) -> str:
+        return self.bridge(tenant).decompress(text)
+    
+    def memory_report(self) -> Dict[str, Any]:
+        """Estimated memory use and cache behaviour."""
+        with self._lock:
+            base_bytes = sys.getsizeof(self.base) + sum(
+                sys.getsizeof(k) + sys.getsizeof(v) for k, v in self.base.items())
+            overlay_bytes = sum(sys.getsizeof(o) + sum(sys.getsizeof(k) + sys.getsizeof(v)
+                                                      for k, v in o.items())
+                                for o in self.overlays.values())
+            return {
+                "tenants": len(self.overlays),
+                "cached_bridges": len(self._bridges),
+                "base_bytes": base_bytes,
+                "overlay_bytes": overlay_bytes,
+                "cached_bridge_bytes": self._cached_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+class DictionaryReloader:
+    """
+    Pick up a new dictionary artifact (a patterns.json, e.g. from the
+    nightly training job) without restarting the process.
+    
+    A daemon thread polls the file's (inode, size, mtime). When it changes,
+    the new tables are built on that thread, in a copy of the template
+    bridge holding base plus the file's patterns, and published with one
+    reference swap under the next version number. Requests never wait on
+    a build and never see half-built tables.
+    
+    compress returns the version it used and decompress takes it back, so
+    a request that spans a swap decompresses with the tables it compressed
+    with; the last keep_versions versions stay available. A file that
+    fails to load (e.g. read mid-write) is skipped until it changes again,
+    and the current version keeps serving.
+    """
+    
+    def __init__(self, path: str, bridge: Optional[StenographicBridge] = None,
+                 base: Optional[Mapping[str, str]] = None,
+                 interval: float = RELOAD_INTERVAL, keep_versions: int = 4):
+        self.path = path
+        self.interval = interval
+        self.keep_versions = keep_versions
+        # Copied for each version, so e.g. a ProductionBridge keeps its stats
+        self._template = StenographicBridge() if bridge is None else bridge
+        # What the file's patterns are merged onto, as in _load_learned_patterns
+        self.base = dict(StenographicBridge().compressions if base is None else base)
+        self._versions = OrderedDict()
+        self._current = None
+        self._signature = None
+        # Serialises builds between the watcher thread and check() callers
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self.reloads = 0
+        self.failures = 0
+        self.last_error: Optional[Exception] = None
+        if not self.check():
+            self._publish(self.base)
+    
+    @property
+    def current(self) -> Tuple[int, StenographicBridge]:
+        """(version, bridge) now serving; hold on to it for a whole request"""
+        return self._current
+    
+    @property
+    def version(self) -> int:
+        return self._current[0]
+    
+    def bridge(self, version: Optional[int] = None) -> StenographicBridge:
+        """The bridge for version, or the current one"""
+        if version is None:
+            return self._current[1]
+        try:
+            return self._versions[version]
+        except KeyError:
+            raise KeyError(f"dictionary version {version} is no longer available "
+                           f"(keep_versions={self.keep_versions})") from None
+    
+    def compress(self, text: str) -> Tuple[str, float, int]:
+        """Compress with the current version; returns (compressed, ratio, version)"""
+        version, bridge = self._current
+        compressed, ratio = bridge.compress(text)
+        return compressed, ratio, version
+    
+    def decompress(self, text: str, version: int) -> str:
+        """Decompress with the version compress returned"""
+        return self.bridge(version).decompress(text)
+    
+    def process_with_llm(self, prompt: str, llm_function: callable, **kwargs) -> Dict[str, Any]:
+        """process_with_llm on one version throughout; the result records which"""
+        version, bridge = self._current
+        result = bridge.process_with_llm(prompt, llm_function, **kwargs)
+        result["dictionary_version"] = version
         return result
+    
+    async def process_with_llm_async(self, prompt: str,
+                                     llm_function: Callable[..., Awaitable[str]],
+                                     **kwargs) -> Dict[str, Any]:
+        version, bridge = self._current
+        result = await bridge.process_with_llm_async(prompt, llm_function, **kwargs)
+        result["dictionary_version"] = version
+        return result
+    
+    async def stream_with_llm(self, prompt: str, llm_stream: Callable[..., AsyncIterator[str]],
+                              **kwargs) -> AsyncIterator[str]:
+        bridge = self._current[1]
+        async for text in bridge.stream_with_llm(prompt, llm_stream, **kwargs):
+            yield text
+    
+    def check(self) -> bool:
+        """Reload now if the file changed since the last attempt; True if it was"""
+        with self._lock:
+            try:
+                info = os.stat(self.path)
+            except FileNotFoundError:
+                return False
+            signature = (info.st_ino, info.st_size, info.st_mtime_ns)
+            if signature == self._signature:
+                return False
+            self._signature = signature
+            try:
+                with open(self.path, 'r') as f:
+                    learned = json.load(f)
+                if not (isinstance(learned, dict) and all(
+                        isinstance(k, str) and isinstance(v, str) for k, v in learned.items())):
+                    raise ValueError(f"{self.path}: expected an object of phrase -> symbol strings")
+            except (OSError, ValueError) as error:
+                self.failures += 1
+                self.last_error = error
+                return False
+            self._publish({**self.base, **learned})
+            return True
+    
+    def _publish(self, compressions: Dict[str, str]):
+        bridge = copy.copy(self._template)
+        bridge.compressions = compressions
+        bridge._rebuild_tables()
+        version = self._current[0] + 1 if self._current else 1
+        self._versions[version] = bridge
+        while len(self._versions) > self.keep_versions:
+            self._versions.popitem(last=False)
+        # One reference store: a reader sees the old pair or the new one
+        self._current = (version, bridge)
+        self.reloads += 1
+    
+    def _watch(self):
+        while not self._stop.wait(self.interval):
+            self.check()
+    
+    def start(self) -> "DictionaryReloader":
+        """Start polling in a daemon thread"""
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._watch, name="dictionary-reloader",
+                                            daemon=True)
+            self._thread.start()
+        return self
+    
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+    
+    def __enter__(self) -> "DictionaryReloader":
+        return self.start()
+    
+    def __exit__(self, *exc_info):
+        self.stop()
+    
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "version": self.version,
+            "versions_kept": list(self._versions),
+            "reloads": self.reloads,
+            "failures": self.failures,
+            "last_error": repr(self.last_error) if self.last_error else None,
+        }
 
 # Example integrations
 class LLMIntegrations:
@@ -389,6 +1352,45 @@ if __name__ == "__main__":
     print(f"  Dollars saved: ${result['metrics']['dollars_saved']:.5f}")
     print(f"  Estimated speedup: {result['metrics']['estimated_speedup']:.1f}x")
     
+    # Many customers, one process: shared base + per-tenant overlays
+    manager = DictionaryManager()
+    manager.update_overlay("acme", {"acme widget": "[AW]"})
+    print(f"\nTenant 'acme': {manager.compress('acme', 'The acme widget is going to ship')[0]}")
+    print(f"Tenant 'other': {manager.compress('other', 'The acme widget is going to ship')[0]}")
+    
+    # Templated prompts: only the segment with the name is compressed again
+    cache = bridge.near_duplicate_cache()
+    for name in ("Alice", "Bob", "Carol"):
+        cache.get(f"Hi {name}, in order to be able to help, we need the fact that "
+                  f"machine learning is going to change the user interface.\n"
+                  f"Thanks for using our application programming interface.")
+    print(f"\nNear-duplicate cache: {cache.stats()}")
+    
+    # A new dictionary is picked up while serving; each request keeps its version
+    with tempfile.TemporaryDirectory() as cache_dir:
+        reloader = DictionaryReloader(os.path.join(cache_dir, "patterns.json"))
+        compressed, _, version = reloader.compress("We ship the acme widget in order to grow")
+        with open(reloader.path, 'w') as f:
+            json.dump({"acme widget": "[AW]"}, f)
+        reloader.check()  # what the watcher thread does every interval
+        print(f"\nDictionary v{version}: {compressed}")
+        print(f"Dictionary v{reloader.version}: "
+              f"{reloader.compress('We ship the acme widget in order to grow')[0]}")
+        print(f"v{version} output decompressed with v{version}: "
+              f"{reloader.decompress(compressed, version)}")
+    
+    # Retrieved passages: repeated sentences are sent once, repeated phrases
+    # through a per-request legend
+    footer = "Contact the platform support rotation if the error persists after a retry."
+    passages = [f"Ticket {n}: the nightly export job in the billing service {problem}. {footer}"
+                for n, problem in ((101, "hit the storage quota"),
+                                   (102, "timed out on the ledger table"),
+                                   (103, "wrote duplicate invoices"))]
+    packed = ContextPacker(bridge).pack(passages)
+    print(f"\nPacked context ({packed.original_cost:.0f} -> {packed.packed_cost:.0f} tokens, "
+          f"{packed.exact_duplicates + packed.near_duplicates} repeated sentences dropped):")
+    print(packed.text)
+    
     print("\n" + "=" * 60)
     print("TO USE WITH YOUR LLM:")
     print("1. Replace mock_llm with your actual API call")